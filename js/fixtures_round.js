@@ -11,11 +11,25 @@ async function loadHA() {
   catch (e) { return null; }
 }
 
+// Forma recente (últimos jogos em casa/fora) gerada por scripts/form_tables.py
+async function loadForm() {
+  try { return await fetch('data/form.json').then(r => r.json()); }
+  catch (e) { return null; }
+}
+
 async function loadMatchesHistory() {
   try { return await fetch('data/matches_full.json').then(r => r.json()); }
   catch (e) { return []; }
 }
 
+// matches_full.json é grande: só é baixado quando algum jogo precisa do histórico
+// (sem previsão pré-calculada, ou conflito de liga sem Div), e uma única vez.
+let matchesHistoryPromise = null;
+function getMatchesHistory() {
+  if (!matchesHistoryPromise) matchesHistoryPromise = loadMatchesHistory();
+  return matchesHistoryPromise;
+}
+
 // Mapeia código de liga do source para nome da liga
 function getLeagueFromSource(source) {
   if (!source) return null;
@@ -187,6 +201,13 @@ function calculateTeamGoalMetrics(teamId, isHome, matchesHistory, homeEloTarget,
   };
 }
 
+// Tendência de ELO lida de data/form.json (uma consulta por clube); null se não houver
+function getFormTrend(form, clubId, isHome) {
+  if (!form || !form.clubs || !clubId) return null;
+  const side = form.clubs[clubId]?.[isHome ? 'home' : 'away'];
+  return side ? side.eloTrend : null;
+}
+
 // Tendência simples de ELO (média das últimas variações)
 function getEloTrend(clubId, isHome, matchesHistory) {
   if (!clubId || !matchesHistory || !matchesHistory.length) return null;
@@ -753,6 +774,21 @@ function calculateTeamOddsWithinSimilarMatches(homeClubId, awayClubId, similarMa
   return result;
 }
 
+// Previsões pré-calculadas por scripts/generate_fixtures.py (data/fixtures.json).
+// Só valem para os ranges com que foram geradas; com outro range, recalcula no navegador.
+function precomputedPrediction(f) {
+  const p = f && f.prediction;
+  if (!p) return null;
+  if (p.marketRange !== CURRENT_MARKET_RANGE || p.eloRange !== CURRENT_ELO_RANGE) return null;
+  return p;
+}
+
+// Análise por odds de mercado pré-calculada (data/market_index.json) para o range atual.
+// undefined = não calculada (recalcula no navegador); null = nenhuma partida com odds parecidas.
+function precomputedMarket(f) {
+  const market = f && f.prediction && f.prediction.market;
+  return market ? market[String(CURRENT_MARKET_RANGE)] : undefined;
+}
 
 async function loadExternalFixtures() {
   // Try loading from cached JSON file first (updated by proxy 2x per week)
@@ -822,11 +858,14 @@ async function init(){
     console.log(`Loaded: ${clubs.length} clubs, ${ratings.length} ratings, ${leagues.length} leagues`);
     
     const ha = await loadHA();
-    const matchesHistory = await loadMatchesHistory();
-    console.log(`Loaded: ${matchesHistory.length} historical matches`);
-    
-    // Analisar distribuição de matches no histórico
-    const distribution = analyzeHistoryDistribution(matchesHistory);
+    const form = await loadForm();
+    let matchesHistory = [];
+    const ensureHistory = async () => {
+      if (!matchesHistory.length) {
+        matchesHistory = await getMatchesHistory();
+        console.log(`Loaded: ${matchesHistory.length} historical matches`);
+      }
+    };
     
     const root = document.getElementById('fixtures-root');
     if (!root) {
@@ -838,18 +877,40 @@ async function init(){
     const fixtures = await loadExternalFixtures();
     console.log(`Loaded ${fixtures.length} external fixtures`);
     
+    // fixtures.json já traz os ids dos clubes resolvidos (homeId/awayId)
+    const clubsById = new Map(clubs.map(c => [c.id, c]));
+    const clubForFixture = (f, side) => {
+      const id = side === 'home' ? f.homeId : f.awayId;
+      return (id !== undefined && id !== null && clubsById.get(id)) || findClubByName(clubs, f[side]);
+    };
+
     // filter to clubs present and leagues present
     const leagueNames = new Set((leagues||[]).map(l=> (l.name||'').toLowerCase()));
+    // Liga do jogo pelo Div do fixtures.json (ex.: 'E0' -> 'premier league')
+    const leagueForDiv = (f) => {
+      if (!f.div) return null;
+      const l = (leagues||[]).find(l => mapLeagueNameToCode(l.name) === f.div);
+      return l ? (l.name||'').toLowerCase() : null;
+    };
+    const hasConflict = (f) => {
+      const h = clubForFixture(f, 'home');
+      const a = clubForFixture(f, 'away');
+      const hl = (h?.league||'').toLowerCase();
+      const al = (a?.league||'').toLowerCase();
+      return !!(h && a && hl && al && hl !== al);
+    };
+    if (fixtures.some(f => hasConflict(f) && !leagueForDiv(f))) await ensureHistory();
+
     const filtered = fixtures.filter(f => {
-      const h = findClubByName(clubs, f.home);
-      const a = findClubByName(clubs, f.away);
+      const h = clubForFixture(f, 'home');
+      const a = clubForFixture(f, 'away');
       if (!h || !a) return false;
       const hl = (h.league||'').toLowerCase();
       const al = (a.league||'').toLowerCase();
       
-      // Se as ligas são diferentes, tenta resolver consultando o histórico
+      // Se as ligas são diferentes, usa o Div do jogo ou, sem ele, consulta o histórico
       if (hl && al && hl !== al) {
-        const resolvedLeague = resolveLeagueConflict(h, a, matchesHistory, clubs);
+        const resolvedLeague = leagueForDiv(f) || resolveLeagueConflict(h, a, matchesHistory, clubs);
         if (!resolvedLeague) return false; // Não conseguiu resolver o conflito
         return leagueNames.has(resolvedLeague);
       }
@@ -1271,8 +1332,9 @@ async function init(){
   };
 
   toShow.slice(0,200).forEach(f => {
-    const hClub = findClubByName(clubs, f.home);
-    const aClub = findClubByName(clubs, f.away);
+    const hClub = clubForFixture(f, 'home');
+    const aClub = clubForFixture(f, 'away');
+    const precomputed = precomputedPrediction(f);
     const homeName = hClub ? hClub.name : f.home;
     const awayName = aClub ? aClub.name : f.away;
     const parsed = parseCsvDate(f.date);
@@ -1300,6 +1362,10 @@ async function init(){
       awayRating = awayObj.awayElo ?? 1800;
       displayHomeElo = homeRating;
       displayAwayElo = awayRating;
+      if (precomputed && f.homeElo !== undefined && f.awayElo !== undefined) {
+        homeRating = displayHomeElo = f.homeElo;
+        awayRating = displayAwayElo = f.awayElo;
+      }
     } else {
       const homeId = hClub && hClub.id;
       const awayId = aClub && aClub.id;
@@ -1318,9 +1384,12 @@ async function init(){
     let homeProb, drawProb, awayProb;
     let historyResult = null;
     let marketOddsResult = null;
+    const marketPrecomputed = precomputed ? undefined : precomputedMarket(f);
     
-    // TENTAR ANÁLISE POR ODDS DE MERCADO PRIMEIRO
-    if (hClub && aClub && homeLeague && matchesHistory.length > 0 && f.oddH && f.oddA) {
+    // TENTAR ANÁLISE POR ODDS DE MERCADO PRIMEIRO (pré-calculada pelo índice de odds, se houver)
+    if (marketPrecomputed) {
+      marketOddsResult = marketPrecomputed.league;
+    } else if (!precomputed && marketPrecomputed === undefined && hClub && aClub && homeLeague && matchesHistory.length > 0 && f.oddH && f.oddA) {
       marketOddsResult = calculateOddsFromMarketOdds(
         hClub.id,
         aClub.id,
@@ -1333,7 +1402,7 @@ async function init(){
     }
     
     // SE NÃO HOUVER ANÁLISE DE ODDS, USAR ANÁLISE POR ELO
-    if (hClub && aClub && homeLeague && matchesHistory.length > 0 && !marketOddsResult) {
+    if (!precomputed && hClub && aClub && homeLeague && matchesHistory.length > 0 && !marketOddsResult) {
       historyResult = calculateOddsFromHistory(
         hClub.id,
         aClub.id,
@@ -1346,7 +1415,7 @@ async function init(){
     }
     
     // Usar resultado de market odds se disponível, caso contrário usar ELO
-    const primaryResult = marketOddsResult || historyResult;
+    const primaryResult = precomputed ? precomputed.league : (marketOddsResult || historyResult);
     
     // Se houver resultado, usar os valores calculados; caso contrário, usar cálculo matemático
     let sampleSize = 0;
@@ -1393,7 +1462,11 @@ async function init(){
     let teamRangeExpanded = false;
     try {
       // Usar função apropriada baseada no tipo de análise
-      if (marketOddsResult) {
+      if (precomputed) {
+        teamHistoryResult = precomputed.team;
+      } else if (marketPrecomputed) {
+        teamHistoryResult = marketPrecomputed.team;
+      } else if (marketOddsResult) {
         teamHistoryResult = calculateTeamOddsFromMarketOdds(
           hClub?.id,
           aClub?.id,
@@ -1465,8 +1538,10 @@ async function init(){
     let awayIndicator = null;
     
     try {
-      const homeTrend = getEloTrend(hClub?.id, true, matchesHistory);
-      const awayTrend = getEloTrend(aClub?.id, false, matchesHistory);
+      const homeTrend = precomputed ? precomputed.homeTrend
+        : (getFormTrend(form, hClub?.id, true) ?? getEloTrend(hClub?.id, true, matchesHistory));
+      const awayTrend = precomputed ? precomputed.awayTrend
+        : (getFormTrend(form, aClub?.id, false) ?? getEloTrend(aClub?.id, false, matchesHistory));
       
       homeIndicator = getEloIndicator(homeRating, homeTrend);
       awayIndicator = getEloIndicator(awayRating, awayTrend);
@@ -2141,7 +2216,11 @@ async function init(){
   console.log(`✓ Fixtures table rendered: ${displayedCount} matches displayed`);
   } // fim da função renderTable
   
+  // Jogos sem previsão pré-calculada (ou com outro range) são calculados a partir do histórico
+  const historyNeeded = () => toShow.some(f => !precomputedPrediction(f) && !precomputedMarket(f));
+
   // Renderizar tabela inicial
+  if (historyNeeded()) await ensureHistory();
   renderTable(0, 0, 'all', 'all');
   
   // Adicionar listeners aos sliders
@@ -2198,7 +2277,7 @@ async function init(){
   // Adicionar listeners aos botões de range
   const rangeBtns = document.querySelectorAll('.range-btn');
   rangeBtns.forEach(btn => {
-    btn.addEventListener('click', () => {
+    btn.addEventListener('click', async () => {
       const newRange = parseFloat(btn.dataset.range);
       CURRENT_MARKET_RANGE = newRange;
       console.log(`🔄 Range de odds alterado para ${(newRange*100).toFixed(0)}%`);
@@ -2218,6 +2297,7 @@ async function init(){
       const filterCountry = document.getElementById('filter-country')?.value || '';
       const filterLeague = document.getElementById('filter-league')?.value || '';
       const filterDate = document.getElementById('filter-date')?.value || '';
+      if (historyNeeded()) await ensureHistory();
       renderTable(minConfidence, minTeamConfidence, homeEloFilter, awayEloFilter, filterCasa, filterFora, filterContinent, filterCountry, filterLeague, filterDate);
     });
   });
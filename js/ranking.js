@@ -1,7 +1,44 @@
 import { loadData } from './data.js';
 
+// Leaderboards prontos (rank, variação e movimento) gerados por scripts/leaderboards.py
+async function loadLeaderboardIndex() {
+  try {
+    const res = await fetch('data/leaderboards/index.json');
+    return res.ok ? await res.json() : null;
+  } catch (e) {
+    return null;
+  }
+}
+
 (async function init() {
   const { clubs, leagues, ratings } = await loadData();
+  const index = await loadLeaderboardIndex();
+  const boards = new Map(); // arquivo -> Promise do conteúdo
+
+  function loadBoard(file) {
+    if (!boards.has(file)) {
+      boards.set(file, fetch(`data/leaderboards/${file}`)
+        .then(r => (r.ok ? r.json() : null))
+        .catch(() => null));
+    }
+    return boards.get(file);
+  }
+
+  function boardFile(leagueVal, continentVal) {
+    if (!index) return null;
+    if (leagueVal) return index.leagues.find(l => l.name === leagueVal)?.file || null;
+    if (continentVal) return index.continents.find(c => c.name === continentVal)?.file || null;
+    return 'all.json';
+  }
+
+  // Sem leaderboards: junta clubes e ratings uma única vez, já ordenado (sem variação)
+  const clubsById = new Map(clubs.map(c => [c.id, c]));
+  const fallbackRows = ratings
+    .map(r => {
+      const club = clubsById.get(r.clubId) || { name: 'Unknown', league: '' };
+      return { name: club.name, league: club.league, continent: club.continent, elo: r.elo };
+    })
+    .sort((a, b) => b.elo - a.elo);
 
   const leagueSelect = document.getElementById('league-filter');
   leagues.forEach(l => {
@@ -12,37 +49,88 @@ import { loadData } from './data.js';
   });
 
   const continentSelect = document.getElementById('continent-filter');
+  const periodSelect = document.getElementById('period-filter');
 
-  function renderTable() {
-    const tbody = document.querySelector('#ranking-table tbody');
+  function formatDelta(row, period) {
+    const delta = row[`change${period}`];
+    if (delta === undefined || delta === null) return '• 0';
+    const move = row[`rankChange${period}`] || 0;
+    const arrow = delta > 0 ? '▲' : (delta < 0 ? '▼' : '•');
+    const moveText = move ? ` <span style="font-size:.85rem;color:var(--muted)">(${move > 0 ? '+' : ''}${move})</span>` : '';
+    return `${arrow} ${delta > 0 ? '+' : ''}${delta.toFixed(1)}${moveText}`;
+  }
+
+  // Classificação da temporada atual (só nos arquivos de liga com CSV)
+  function formatSeason(season) {
+    return season && season.length === 4 ? `20${season.slice(0, 2)}/${season.slice(2)}` : (season || '');
+  }
+
+  function renderStandings(board) {
+    const section = document.getElementById('standings-section');
+    const standings = board && board.standings;
+    section.hidden = !standings || !standings.length;
+    if (section.hidden) return;
+    document.getElementById('standings-title').textContent = `Classificação ${formatSeason(board.season)}`;
+    const tbody = document.querySelector('#standings-table tbody');
     tbody.innerHTML = '';
+    standings.forEach(row => {
+      const tr = document.createElement('tr');
+      tr.innerHTML = `
+        <td><div class="rank-badge">${row.position}</div></td>
+        <td><div class="club-name">${row.name}</div></td>
+        <td>${row.played}</td>
+        <td>${row.won}</td>
+        <td>${row.drawn}</td>
+        <td>${row.lost}</td>
+        <td>${row.goalsFor}</td>
+        <td>${row.goalsAgainst}</td>
+        <td>${row.goalDifference > 0 ? '+' : ''}${row.goalDifference}</td>
+        <td style="font-weight:700">${row.points}</td>
+      `;
+      tbody.appendChild(tr);
+    });
+  }
+
+  let renderId = 0;
+  async function renderTable() {
+    const current = ++renderId;
     const leagueVal = leagueSelect.value;
     const continentVal = continentSelect.value;
+    const period = periodSelect.value;
+
+    const file = boardFile(leagueVal, continentVal);
+    const board = file ? await loadBoard(file) : null;
+    if (current !== renderId) return; // outro filtro foi escolhido enquanto carregava
 
-    const rows = ratings
-      .map(r => {
-        const club = clubs.find(c => c.id === r.clubId) || { name: 'Unknown', league: '' };
-        return { club, elo: r.elo, delta: 0 };
-      })
-      .filter(row => (leagueVal ? row.club.league === leagueVal : true))
-      .filter(row => (continentVal ? row.club.continent === continentVal : true))
-      .sort((a, b) => b.elo - a.elo);
+    let rows;
+    if (board) {
+      // já vem ordenado e com rank; só filtra o continente quando há liga escolhida
+      rows = continentVal && leagueVal ? board.rows.filter(r => r.continent === continentVal) : board.rows;
+    } else {
+      rows = fallbackRows
+        .filter(row => (leagueVal ? row.league === leagueVal : true))
+        .filter(row => (continentVal ? row.continent === continentVal : true));
+    }
 
+    const tbody = document.querySelector('#ranking-table tbody');
+    tbody.innerHTML = '';
     rows.forEach((row, idx) => {
       const tr = document.createElement('tr');
       tr.innerHTML = `
-        <td><div class="rank-badge">${idx + 1}</div></td>
-        <td><div class="club-name">${row.club.name}</div><div style="font-size:.85rem;color:var(--muted)">${row.club.league || ''}</div></td>
-        <td>${row.club.league || ''}</td>
+        <td><div class="rank-badge">${row.rank || idx + 1}</div></td>
+        <td><div class="club-name">${row.name}</div><div style="font-size:.85rem;color:var(--muted)">${row.league || ''}</div></td>
+        <td>${row.league || ''}</td>
         <td style="font-weight:700">${Math.round(row.elo)}</td>
-        <td>${row.delta > 0 ? '▲' : (row.delta < 0 ? '▼' : '•')} ${row.delta}</td>
+        <td>${formatDelta(row, period)}</td>
       `;
       tbody.appendChild(tr);
     });
+    renderStandings(leagueVal ? board : null);
   }
 
   leagueSelect.addEventListener('change', renderTable);
   continentSelect.addEventListener('change', renderTable);
+  periodSelect.addEventListener('change', renderTable);
 
   renderTable();
 })();
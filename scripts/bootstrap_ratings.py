@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Bootstrap confidence intervals for the Elo ratings and the fixture predictions.
+
+Re-runs the rating pass of generate_matches_and_ratings.py (overall Elo with
+home advantage, home/away Elo without it, shrinkage blend of the two) over
+many resamples of data/matches_full.json and writes data/rating_intervals.json:
+
+    {updated, resamples, level, matches,
+     clubs:    [{clubId, name, league, homeGames, awayGames,
+                 elo | homeElo | awayElo: {value, low, median, high, sd}}],
+     fixtures: [{home, away, date, time, div, homeId, awayId,
+                 homeProb | drawProb | awayProb: {value, low, median, high}}]}
+
+`value` is the rating of the full history (what ratings.json and
+ratings_home_away.json hold), low/high the percentile interval at --level.
+Fixture probabilities come from generate_fixtures.elo_outcome_probs on the
+home/away ratings of every resample, for the fixtures of data/fixtures.json.
+
+Resamples are Poisson bootstraps: every match is played w ~ Poisson(1)
+times (0 = dropped), in its original order, so a whole chunk of resamples
+shares one chronological pass and is rated as NumPy columns. Chunks run in
+a process pool; the match arrays are placed once in shared memory and the
+workers only read them.
+
+    python scripts/bootstrap_ratings.py                   # 500 resamples, 95% intervals
+    python scripts/bootstrap_ratings.py --resamples 1000 --level 0.9 --workers 8
+"""
+import argparse
+import json
+import math
+import os
+import time
+from datetime import datetime
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from generate_fixtures import elo_outcome_probs
+from generate_matches_and_ratings import BASE_ELO, HOME_ADV, K, SHRINKAGE_TAU, margin_multiplier
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CLUBS_FILE = os.path.join(DATA_DIR, 'clubs.json')
+MATCHES_FILE = os.path.join(DATA_DIR, 'matches_full.json')
+FIXTURES_FILE = os.path.join(DATA_DIR, 'fixtures.json')
+OUT_FILE = os.path.join(DATA_DIR, 'rating_intervals.json')
+
+RESAMPLES = 500
+MAX_CHUNK = 250  # resamples rated together in one worker task
+
+_shared = {}
+
+
+def share_arrays(arrays):
+    """Copy named arrays into one shared memory block. Returns (block, layout)."""
+    block = SharedMemory(create=True, size=sum(a.nbytes for a in arrays.values()))
+    layout, offset = [], 0
+    for name, a in arrays.items():
+        np.ndarray(a.shape, a.dtype, buffer=block.buf, offset=offset)[...] = a
+        layout.append((name, a.shape, a.dtype.str, offset))
+        offset += a.nbytes
+    return block, layout
+
+
+def attach(name, layout):
+    """Pool initializer: read-only views of the shared match arrays."""
+    block = SharedMemory(name=name)
+    _shared['block'] = block
+    for key, shape, dtype, offset in layout:
+        view = np.ndarray(shape, np.dtype(dtype), buffer=block.buf, offset=offset)
+        view.flags.writeable = False
+        _shared[key] = view
+
+
+def rate(arrays, n_clubs, weights=None):
+    """Final overall, blended home and blended away ratings, each (clubs, resamples).
+
+    `weights` is (matches, resamples): how many times every match is played in
+    every resample. None rates the full history once, like the generator.
+    """
+    rows_home, rows_away = arrays['rows_home'], arrays['rows_away']
+    score, km = arrays['score'], arrays['km']
+    size = 1 if weights is None else weights.shape[1]
+
+    # overall, home and away ratings stacked: club c is row c, n_clubs + c, 2 * n_clubs + c
+    state = np.full((3 * n_clubs, size), float(BASE_ELO))
+    adv = np.array([[HOME_ADV], [0.0]])
+    repeats = np.ones(len(score), dtype=np.int64) if weights is None else weights.max(axis=1)
+    for t in range(len(score)):
+        rh, ra = rows_home[t], rows_away[t]
+        for r in range(repeats[t]):
+            x = state[rh] - state[ra] + adv
+            delta = km[t] * (score[t] - 1 / (1 + 10 ** (-x / 400)))
+            if weights is not None:
+                delta *= weights[t] > r
+            state[rh] += delta
+            state[ra] -= delta
+
+    overall = state[:n_clubs]
+    home = state[n_clubs:2 * n_clubs]
+    away = state[2 * n_clubs:]
+    home_games = np.zeros((n_clubs, size))
+    away_games = np.zeros((n_clubs, size))
+    w = np.ones((len(score), 1)) if weights is None else weights
+    np.add.at(home_games, rows_home[:, 0], w)
+    np.add.at(away_games, rows_away[:, 0], w)
+    hw = home_games / (home_games + SHRINKAGE_TAU)
+    aw = away_games / (away_games + SHRINKAGE_TAU)
+    return overall, hw * home + (1 - hw) * overall, aw * away + (1 - aw) * overall
+
+
+def rate_chunk(task):
+    seed, size, n_clubs = task
+    rng = np.random.default_rng(seed)
+    weights = rng.poisson(1.0, size=(len(_shared['score']), size)).astype(np.int8)
+    return np.stack(rate(_shared, n_clubs, weights))
+
+
+def match_arrays(matches, index):
+    """Chronological match arrays for rate(): stacked-state rows, result and K * margin."""
+    n_clubs = len(index)
+    rated = [m for m in matches if m['home'] in index and m['away'] in index]
+    home = np.array([index[m['home']] for m in rated], dtype=np.int32)
+    away = np.array([index[m['away']] for m in rated], dtype=np.int32)
+    hg = np.array([m['homeGoals'] for m in rated])
+    ag = np.array([m['awayGoals'] for m in rated])
+    return {
+        'rows_home': np.stack([home, n_clubs + home], axis=1),
+        'rows_away': np.stack([away, 2 * n_clubs + away], axis=1),
+        'score': np.where(hg > ag, 1.0, np.where(hg == ag, 0.5, 0.0)),
+        'km': K * np.array([margin_multiplier(abs(int(d))) for d in hg - ag], dtype=float),
+    }
+
+
+def interval(value, samples, lo, hi, digits):
+    low, median, high = np.percentile(samples, [lo, 50, hi])
+    return {'value': round(float(value), digits), 'low': round(float(low), digits),
+            'median': round(float(median), digits), 'high': round(float(high), digits)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bootstrap intervals for ratings and fixture probabilities')
+    parser.add_argument('--resamples', type=int, default=RESAMPLES, help=f'bootstrap resamples (default: {RESAMPLES})')
+    parser.add_argument('--level', type=float, default=0.95, help='interval coverage (default: 0.95)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=None, help='random seed (default: fresh entropy)')
+    parser.add_argument('--out', default=OUT_FILE, help='output file (default: data/rating_intervals.json)')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    with open(CLUBS_FILE, 'r', encoding='utf-8') as f:
+        clubs = [c for c in json.load(f) if c.get('id') is not None]
+    with open(MATCHES_FILE, 'r', encoding='utf-8') as f:
+        matches = json.load(f)
+    fixtures = []
+    if os.path.exists(FIXTURES_FILE):
+        with open(FIXTURES_FILE, 'r', encoding='utf-8') as f:
+            fixtures = [fx for fx in json.load(f).get('fixtures', [])
+                        if fx.get('homeId') is not None and fx.get('awayId') is not None]
+
+    index = {c['id']: i for i, c in enumerate(clubs)}
+    n_clubs = len(clubs)
+    arrays = match_arrays(matches, index)
+    n_matches = len(arrays['score'])
+    point = rate(arrays, n_clubs)
+
+    # chunks of at most MAX_CHUNK resamples, at least one per worker
+    workers = max(1, min(args.workers, args.resamples))
+    size = min(MAX_CHUNK, math.ceil(args.resamples / workers))
+    sizes = [size] * (args.resamples // size) + ([args.resamples % size] if args.resamples % size else [])
+    seeds = np.random.SeedSequence(args.seed).spawn(len(sizes))
+    tasks = [(seed, s, n_clubs) for seed, s in zip(seeds, sizes)]
+
+    block, layout = share_arrays(arrays)
+    try:
+        with Pool(workers, initializer=attach, initargs=(block.name, layout)) as pool:
+            results = pool.map(rate_chunk, tasks)
+    finally:
+        block.close()
+        block.unlink()
+    samples = np.concatenate(results, axis=2)  # (3, clubs, resamples)
+
+    lo, hi = 50 * (1 - args.level), 50 * (1 + args.level)
+    home_games = np.bincount(arrays['rows_home'][:, 0], minlength=n_clubs)
+    away_games = np.bincount(arrays['rows_away'][:, 0], minlength=n_clubs)
+    club_rows = []
+    for i, c in enumerate(clubs):
+        row = {'clubId': c['id'], 'name': c.get('name'), 'league': c.get('league'),
+               'homeGames': int(home_games[i]), 'awayGames': int(away_games[i])}
+        for k, key in enumerate(('elo', 'homeElo', 'awayElo')):
+            row[key] = interval(point[k][i, 0], samples[k, i], lo, hi, 2)
+            row[key]['sd'] = round(float(samples[k, i].std()), 2)
+        club_rows.append(row)
+
+    fixture_rows = []
+    for fx in fixtures:
+        if fx['homeId'] not in index or fx['awayId'] not in index:
+            continue
+        h, a = index[fx['homeId']], index[fx['awayId']]
+        value = elo_outcome_probs(point[1][h, 0], point[2][a, 0])
+        probs = np.array([elo_outcome_probs(he, ae) for he, ae in zip(samples[1, h], samples[2, a])])
+        row = {key: fx.get(key) for key in ('home', 'away', 'date', 'time', 'div', 'homeId', 'awayId')}
+        for k, key in enumerate(('homeProb', 'drawProb', 'awayProb')):
+            row[key] = interval(value[k], probs[:, k], lo, hi, 4)
+        fixture_rows.append(row)
+
+    out = {
+        'updated': datetime.utcnow().replace(microsecond=0).isoformat() + 'Z',
+        'method': 'poisson-bootstrap',
+        'resamples': args.resamples,
+        'level': args.level,
+        'matches': n_matches,
+        'clubs': club_rows,
+        'fixtures': fixture_rows,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(out, f, ensure_ascii=False)
+
+    print(f'Rated {n_matches} matches x {args.resamples} resamples in {len(tasks)} chunks '
+          f'on {workers} worker(s) ({time.perf_counter() - started:.1f}s)')
+    print(f'Wrote intervals for {len(club_rows)} clubs and {len(fixture_rows)} fixtures to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Versioned, append-only change feed of matches and club ratings.
+
+After each generator run, publish() compares the new matches and ratings
+with the previous run and, when something changed, bumps the version and
+writes one delta segment to data/changes/:
+
+    data/changes/manifest.json        {version, baseVersion, segments: [...]}
+    data/changes/delta_000042.json    {version, previous, matches, removed,
+                                       ratingsHomeAway, ratings}
+
+matches holds new or changed matches (full objects, as in matches_full.json),
+removed the keys of matches that are gone. A match key is
+"source|date|home|away"; the positional `id` is left out of the comparison
+(it shifts whenever a match is inserted), so clients should key matches by
+match key, not by id. The full JSON files are the base snapshot: when a
+run changes a large part of the history (e.g. a correction early in a season
+shifts every later rating) or every BASE_EVERY versions, the current version
+becomes the new base and older segments are dropped. A client holding
+version N applies the segments after N, or reloads the full files when
+N < baseVersion. fixture_proxy.py serves the merged delta at /changes?since=N.
+"""
+import glob
+import hashlib
+import json
+import os
+from datetime import datetime
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+FEED_DIR = os.path.join(DATA_DIR, 'changes')
+MANIFEST = 'manifest.json'
+STATE = 'state.json'
+
+BASE_EVERY = 50          # versions between forced base snapshots
+BASE_CHANGE_RATIO = 0.2  # a delta touching more than this share of matches becomes a base
+
+
+def match_key(m):
+    return f"{m.get('source')}|{m.get('date') or ''}|{m.get('home')}|{m.get('away')}"
+
+
+def fingerprint(obj):
+    raw = json.dumps(obj, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def match_fingerprint(m):
+    return fingerprint({k: v for k, v in m.items() if k != 'id'})
+
+
+def segment_name(version):
+    return f'delta_{version:06d}.json'
+
+
+def read_json(path, default):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_json(path, obj):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def publish(matches, ratings_ha, ratings, feed_dir=FEED_DIR):
+    """Record this run in the feed. Returns the manifest."""
+    os.makedirs(feed_dir, exist_ok=True)
+    manifest_path = os.path.join(feed_dir, MANIFEST)
+    state_path = os.path.join(feed_dir, STATE)
+    manifest = read_json(manifest_path, {'version': 0, 'baseVersion': 0, 'segments': []})
+    state = read_json(state_path, None)
+
+    match_prints = {match_key(m): match_fingerprint(m) for m in matches}
+    ha_prints = {str(r['clubId']): fingerprint(r) for r in ratings_ha}
+    overall_prints = {str(r['clubId']): fingerprint({k: v for k, v in r.items() if k != 'date'}) for r in ratings}
+
+    version = manifest['version'] + 1
+    now = datetime.utcnow().replace(microsecond=0).isoformat() + 'Z'
+    if state is None:
+        # first run (or state.json lost): the full files are the base, older segments are void
+        for path in glob.glob(os.path.join(feed_dir, 'delta_*.json')):
+            os.remove(path)
+        manifest.update(version=version, baseVersion=version, segments=[], updated=now)
+    else:
+        old_matches = state['matches']
+        changed = [m for m in matches if old_matches.get(match_key(m)) != match_prints[match_key(m)]]
+        removed = sorted(set(old_matches) - set(match_prints))
+        ha_changed = [r for r in ratings_ha if state['ratingsHomeAway'].get(str(r['clubId'])) != ha_prints[str(r['clubId'])]]
+        overall_changed = [r for r in ratings if state['ratings'].get(str(r['clubId'])) != overall_prints[str(r['clubId'])]]
+
+        if not (changed or removed or ha_changed or overall_changed):
+            return manifest
+
+        rebase = (len(changed) + len(removed) > BASE_CHANGE_RATIO * max(len(matches), 1)
+                  or version - manifest['baseVersion'] >= BASE_EVERY)
+        if rebase:
+            for seg in manifest['segments']:
+                path = os.path.join(feed_dir, seg['file'])
+                if os.path.exists(path):
+                    os.remove(path)
+            manifest.update(version=version, baseVersion=version, segments=[], updated=now)
+        else:
+            name = segment_name(version)
+            write_json(os.path.join(feed_dir, name), {
+                'version': version,
+                'previous': manifest['version'],
+                'matches': changed,
+                'removed': removed,
+                'ratingsHomeAway': ha_changed,
+                'ratings': overall_changed,
+            })
+            manifest['segments'].append({'version': version, 'file': name, 'created': now,
+                                         'matches': len(changed), 'removed': len(removed),
+                                         'ratings': len(ha_changed)})
+            manifest.update(version=version, updated=now)
+
+    write_json(state_path, {'version': version, 'matches': match_prints,
+                            'ratingsHomeAway': ha_prints, 'ratings': overall_prints})
+    write_json(manifest_path, manifest)
+    return manifest
+
+
+def changes_since(since, feed_dir=FEED_DIR):
+    """Merged delta from version `since` to the current version."""
+    manifest = read_json(os.path.join(feed_dir, MANIFEST), None)
+    if manifest is None:
+        return None
+    out = {'since': since, 'version': manifest['version'], 'baseVersion': manifest['baseVersion']}
+    if since < manifest['baseVersion']:
+        # too old (or unknown): reload matches_full.json and the ratings files
+        out['reset'] = True
+        return out
+
+    matches, removed, ha, overall = {}, set(), {}, {}
+    for seg in manifest['segments']:
+        if seg['version'] <= since:
+            continue
+        delta = read_json(os.path.join(feed_dir, seg['file']), {})
+        for m in delta.get('matches', []):
+            key = match_key(m)
+            matches[key] = m
+            removed.discard(key)
+        for key in delta.get('removed', []):
+            matches.pop(key, None)
+            removed.add(key)
+        ha.update((r['clubId'], r) for r in delta.get('ratingsHomeAway', []))
+        overall.update((r['clubId'], r) for r in delta.get('ratings', []))
+    out.update(reset=False, matches=list(matches.values()), removed=sorted(removed),
+               ratingsHomeAway=list(ha.values()), ratings=list(overall.values()))
+    return out
+
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Fuzzy club-name matcher backed by a prebuilt character trigram index.
+
+The index covers every club name in data/clubs.json plus the optional
+"aliases" list of each club. A lookup only touches the clubs that share at
+least one trigram with the query, so resolving thousands of fixture names
+costs milliseconds instead of a difflib scan over every club per name.
+
+A second, per-character index gives close_keys(), the drop-in for
+difflib.get_close_matches over the same keys: difflib's ratio can never
+exceed the character overlap of the two strings, so only the keys whose
+overlap clears the cutoff are scored (a trigram shortlist alone would miss
+pairs like "axhira"/"bahia" that share letters but no trigram).
+
+Used by generate_fixtures.py (fixture names), by fixture_proxy.py
+(/resolve?name=...), by the generator (suggestions for unmapped names) and
+as a batch CLI:
+
+    python scripts/club_matcher.py "Man United" "Nott'm Forest"
+    python scripts/club_matcher.py --file names.txt --limit 3
+"""
+import argparse
+import difflib
+import heapq
+import json
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter, defaultdict
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CLUBS_FILE = os.path.join(DATA_DIR, 'clubs.json')
+
+DEFAULT_LIMIT = 5
+DEFAULT_CUTOFF = 0.6
+
+
+def normalize(name):
+    if not name:
+        return ''
+    # NFKD/NFD to separate accents
+    n = unicodedata.normalize('NFD', name)
+    # remove diacritics
+    n = ''.join(ch for ch in n if unicodedata.category(ch) != 'Mn')
+    # remove punctuation except spaces
+    n = re.sub(r"[\.\'\",:;\-\(\)\[\]/]", '', n)
+    n = n.strip().lower()
+    return n
+
+
+def trigrams(key):
+    # pad so that word starts weigh more than word middles ("man" in "man city")
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ClubMatcher:
+    """Trigram and character indexes over club names and aliases."""
+
+    def __init__(self, clubs):
+        self.keys = []        # normalized key per entry
+        self.entries = []     # (clubId, display name) per entry
+        self.gram_counts = []
+        self.exact = {}
+        self.postings = defaultdict(list)
+        self.char_postings = defaultdict(list)   # char -> [(entry, count)]
+        for c in clubs:
+            cid = c.get('id')
+            nm = c.get('name')
+            if cid is None or not nm:
+                continue
+            for label in [nm] + list(c.get('aliases') or []):
+                key = normalize(label)
+                if not key or key in self.exact:
+                    continue
+                idx = len(self.keys)
+                grams = trigrams(key)
+                self.keys.append(key)
+                self.entries.append((cid, nm))
+                self.gram_counts.append(len(grams))
+                self.exact[key] = idx
+                for g in grams:
+                    self.postings[g].append(idx)
+                for ch, count in Counter(key).items():
+                    self.char_postings[ch].append((idx, count))
+
+    @classmethod
+    def from_file(cls, path=CLUBS_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match(self, name, limit=DEFAULT_LIMIT, cutoff=DEFAULT_CUTOFF):
+        """Return up to `limit` candidates as dicts, best first.
+
+        The score blends the trigram Dice coefficient with difflib's ratio,
+        which is only computed for the short list the index produced.
+        """
+        key = normalize(name)
+        if not key:
+            return []
+        if key in self.exact and limit == 1:
+            # an exact hit scores 1.0 and always comes first
+            cid, nm = self.entries[self.exact[key]]
+            return [{'clubId': cid, 'name': nm, 'matched': key, 'score': 1.0}]
+
+        grams = trigrams(key)
+        shared = defaultdict(int)
+        for g in grams:
+            for idx in self.postings.get(g, ()):
+                shared[idx] += 1
+        if not shared:
+            return []
+
+        n_grams = len(grams)
+        dice = {idx: 2 * s / (n_grams + self.gram_counts[idx]) for idx, s in shared.items()}
+        shortlist = sorted(dice, key=dice.get, reverse=True)[:limit * 2]
+
+        best = {}
+        for idx in shortlist:
+            ratio = difflib.SequenceMatcher(None, key, self.keys[idx]).ratio()
+            score = (dice[idx] + ratio) / 2
+            if score < cutoff:
+                continue
+            cid, nm = self.entries[idx]
+            # an alias and the main name can both hit the same club: keep the best
+            if cid not in best or score > best[cid]['score']:
+                best[cid] = {'clubId': cid, 'name': nm, 'matched': self.keys[idx], 'score': round(score, 4)}
+        return sorted(best.values(), key=lambda r: r['score'], reverse=True)[:limit]
+
+    def close_keys(self, name, n=DEFAULT_LIMIT, cutoff=DEFAULT_CUTOFF):
+        """difflib.get_close_matches(normalize(name), keys, n, cutoff), same result.
+
+        Shortlists the keys whose character overlap with the name (difflib's
+        quick_ratio bound) reaches the cutoff, then scores them with difflib.
+        """
+        key = normalize(name)
+        if not key:
+            return []
+        overlap = defaultdict(int)
+        for ch, count in Counter(key).items():
+            for idx, c in self.char_postings.get(ch, ()):
+                overlap[idx] += min(count, c)
+
+        s = difflib.SequenceMatcher()
+        s.set_seq2(key)
+        scored = []
+        for idx, common in overlap.items():
+            x = self.keys[idx]
+            if 2 * common / (len(key) + len(x)) < cutoff:
+                continue
+            s.set_seq1(x)
+            if s.real_quick_ratio() >= cutoff and s.ratio() >= cutoff:
+                scored.append((s.ratio(), x))
+        return [x for _, x in heapq.nlargest(n, scored)]
+
+    def resolve(self, name, cutoff=DEFAULT_CUTOFF):
+        """Best club id for `name`, or None when nothing clears the cutoff."""
+        found = self.match(name, limit=1, cutoff=cutoff)
+        return found[0]['clubId'] if found else None
+
+    def match_many(self, names, limit=DEFAULT_LIMIT, cutoff=DEFAULT_CUTOFF):
+        out = {}
+        for name in names:
+            if name not in out:
+                out[name] = self.match(name, limit=limit, cutoff=cutoff)
+        return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Resolve club names against data/clubs.json')
+    parser.add_argument('names', nargs='*', help='names to resolve')
+    parser.add_argument('--file', help='read names from a file, one per line ("-" for stdin)')
+    parser.add_argument('--clubs', default=CLUBS_FILE, help='clubs file (default: data/clubs.json)')
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--cutoff', type=float, default=DEFAULT_CUTOFF)
+    args = parser.parse_args(argv)
+
+    names = list(args.names)
+    if args.file:
+        fh = sys.stdin if args.file == '-' else open(args.file, 'r', encoding='utf-8')
+        with fh:
+            names.extend(line.strip() for line in fh if line.strip())
+    if not names:
+        parser.error('no names given')
+
+    t0 = time.perf_counter()
+    matcher = ClubMatcher.from_file(args.clubs)
+    t1 = time.perf_counter()
+    result = matcher.match_many(names, limit=args.limit, cutoff=args.cutoff)
+    t2 = time.perf_counter()
+
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    print(f'Indexed {len(matcher.keys)} names in {(t1 - t0) * 1000:.1f} ms, '
+          f'resolved {len(result)} names in {(t2 - t1) * 1000:.1f} ms', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of parsed CSV rows, keyed by file content.
+
+Past seasons never change, so the scripts that read data/*.csv
+(generate_matches_and_ratings.py, generate_matches_full.py,
+generate_clubs.py) keep each file's parsed, name-resolved and date-parsed
+rows in data/cache/<namespace>/ as a pickle named after the file, the SHA-1
+of its content and a version hash. The version covers whatever the parse
+depends on besides the file, e.g. the club/alias table, so editing
+clubs.json invalidates every entry while a new season's CSV only misses
+for that file.
+
+    cache = CorpusCache('ratings', version=[PARSE_VERSION, name_table])
+    rows = cache.load(path, parse_csv)     # parse_csv(path) on a miss
+    print(cache.summary())
+
+Delete data/cache/ (or pass --no-cache to the scripts) to parse everything.
+"""
+import glob
+import hashlib
+import json
+import os
+import pickle
+import time
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def version_hash(version):
+    raw = json.dumps(version, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()[:12]
+
+
+class CorpusCache:
+    def __init__(self, namespace, version=None, cache_dir=CACHE_DIR, enabled=True):
+        self.dir = os.path.join(cache_dir, namespace)
+        self.version = version_hash(version)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.load_time = 0.0
+        self.parse_time = 0.0
+
+    def entry_path(self, path, digest):
+        return os.path.join(self.dir, f'{os.path.basename(path)}.{digest[:16]}.{self.version}.pickle')
+
+    def load(self, path, parse):
+        """parse(path), or its cached result when the file and version are unchanged."""
+        start = time.perf_counter()
+        if self.enabled:
+            cached = self.entry_path(path, file_hash(path))
+            if os.path.exists(cached):
+                try:
+                    with open(cached, 'rb') as f:
+                        value = pickle.load(f)
+                    self.hits += 1
+                    self.load_time += time.perf_counter() - start
+                    return value
+                except (OSError, EOFError, pickle.UnpicklingError):
+                    pass  # unreadable entry: parse again and overwrite it
+
+        value = parse(path)
+        self.misses += 1
+        if self.enabled:
+            self.store(path, cached, value)
+        self.parse_time += time.perf_counter() - start
+        return value
+
+    def store(self, path, cached, value):
+        os.makedirs(self.dir, exist_ok=True)
+        # entries for older contents or versions of this file are dead
+        for old in glob.glob(os.path.join(self.dir, glob.escape(os.path.basename(path)) + '.*.pickle')):
+            if old != cached:
+                os.remove(old)
+        tmp = cached + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cached)
+
+    def summary(self):
+        if not self.enabled:
+            return f'Corpus cache disabled: parsed {self.misses} files in {self.parse_time:.2f}s'
+        return (f'Corpus cache: {self.hits} hits ({self.load_time:.2f}s), '
+                f'{self.misses} parsed ({self.parse_time:.2f}s) in {self.dir}')
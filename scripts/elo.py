@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""
+Elo parameters of generate_matches_and_ratings.py.
+
+Kept in their own module so that the modules the generator imports
+(leaderboards, rating_history, glicko2) can use them without importing it back.
+"""
+BASE_ELO = 1800
+K = 35
+HOME_ADV = 100
+SHRINKAGE_TAU = 30  # parâmetro para blendar com overall quando poucos jogos
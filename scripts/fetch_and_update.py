@@ -2,12 +2,36 @@
 Fetch latest league CSVs from football-data.co.uk and regenerate matches and ratings.
 This version saves a compressed timestamped backup of each downloaded CSV to data/backups/.
 
-Downloads the provided list of URLs into the local data/ folder with filenames like E0_2526.csv
-Then calls the existing generator script `scripts/generate_matches_and_ratings.py` using the
-same Python interpreter.
+The leagues come from download_seasons.LEAGUES plus every league code found in data/,
+and the season code from today's date (seasons roll over on 1 July: 2526 -> 2627), so
+nothing goes stale at the rollover. Each run only polls the leagues that can have new
+results, keeping what it learned in data/fetch_state.json:
 
-This script is safe to run manually and is suitable to be scheduled (Task Scheduler / cron).
+  - a league whose games in the fixtures feed (data/fixtures.json) have finished but
+    are not in its CSV yet is fetched, again every RETRY_HOURS until they appear. Those
+    games are remembered in the state file, because the feed drops them once played;
+  - a league with upcoming games in the feed waits for them;
+  - otherwise (international break, off-season, no feed) it is polled with a backoff
+    that doubles on every unchanged download, up to MAX_INTERVAL_DAYS; a league whose
+    last match is older than OFF_SEASON_DAYS goes straight to the longest interval.
+
+Downloads are compared by content hash: unchanged files are not rewritten or backed up.
+The generator `scripts/generate_matches_and_ratings.py` only runs when a CSV changed,
+and `scripts/generate_fixtures.py` runs after it, or on its own when data/fixtures.json
+is missing, older than FIXTURES_MAX_AGE_HOURS or lists games that have kicked off.
+
+This script is safe to run manually and is suitable to be scheduled (Task Scheduler / cron)
+as often as daily:
+
+    python scripts/fetch_and_update.py            # adaptive run
+    python scripts/fetch_and_update.py --dry-run  # print the plan, download nothing
+    python scripts/fetch_and_update.py --all      # old behaviour: fetch every league, regenerate
 """
+import argparse
+import csv
+import gzip
+import hashlib
+import json
 import os
 import sys
 import urllib.request
@@ -15,26 +39,32 @@ import urllib.error
 from urllib.parse import urlsplit
 import time
 import subprocess
-import gzip
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from generate_matches_and_ratings import parse_date
+
+try:
+    from download_seasons import LEAGUES
+except ImportError:  # download_seasons needs `requests`; the local CSVs still give the leagues
+    LEAGUES = {}
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(ROOT, 'data')
 BACKUP_DIR = os.path.join(DATA_DIR, 'backups')
 LOG_FILE = os.path.join(ROOT, 'scripts', 'fetch_and_update.log')
+STATE_FILE = os.path.join(DATA_DIR, 'fetch_state.json')
+FIXTURES_FILE = os.path.join(DATA_DIR, 'fixtures.json')
 
-URLS = [
-    'https://www.football-data.co.uk/mmz4281/2526/E0.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/E1.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/D1.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/D2.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/I1.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/I2.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/F1.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/F2.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/SP1.csv',
-    'https://www.football-data.co.uk/mmz4281/2526/SP2.csv'
-]
+BASE_URL = 'https://www.football-data.co.uk/mmz4281'
+SEASON_START_MONTH = 7
+
+RESULT_DELAY_HOURS = 3      # kick-off to result available in the CSV, at the earliest
+RETRY_HOURS = 12            # re-poll a league with pending results at most this often
+PENDING_DAYS = 7            # older missing results are postponed games, not pending
+MIN_INTERVAL_DAYS = 1       # backoff without feed information: 1, 2, 4, ... days
+MAX_INTERVAL_DAYS = 14
+OFF_SEASON_DAYS = 30        # no match for this long: off-season, poll at MAX_INTERVAL_DAYS
+FIXTURES_MAX_AGE_HOURS = 24
 
 # ensure data and backup dirs exist
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -48,6 +78,38 @@ def log(msg):
     print(msg)
 
 
+def season_code(day):
+    """'2526' for any day from 1 July 2025 to 30 June 2026."""
+    start = day.year if day.month >= SEASON_START_MONTH else day.year - 1
+    return f'{start % 100:02d}{(start + 1) % 100:02d}'
+
+
+def previous_season(season):
+    """'2425' for '2526'."""
+    start = int(season[:2])
+    return f'{(start - 1) % 100:02d}{start:02d}'
+
+
+def local_season(code):
+    """Most recent season with a data/<code>_<season>.csv, or None."""
+    seasons = [os.path.splitext(fname)[0].split('_', 1)[1] for fname in os.listdir(DATA_DIR)
+               if fname.endswith('.csv') and fname.upper().startswith(f'{code}_')]
+    return max(seasons) if seasons else None
+
+
+def league_codes():
+    """download_seasons.LEAGUES plus every league code with a CSV in data/."""
+    codes = set(LEAGUES)
+    for fname in os.listdir(DATA_DIR):
+        if fname.endswith('.csv') and '_' in fname:
+            codes.add(fname.split('_')[0].upper())
+    return sorted(codes)
+
+
+def url_for(code, season):
+    return f'{BASE_URL}/{season}/{code}.csv'
+
+
 def local_filename_for_url(url):
     p = urlsplit(url).path
     parts = [p for p in p.split('/') if p]
@@ -63,18 +125,151 @@ def local_filename_for_url(url):
     return os.path.join(DATA_DIR, local)
 
 
-def download_url(url, dest):
+def last_sunday(year, month):
+    day = datetime(year, month + 1, 1) - timedelta(days=1)
+    return day - timedelta(days=(day.weekday() + 1) % 7)
+
+
+def uk_to_utc(local):
+    """UK local time (the feed's kick-off times) to naive UTC: BST is UTC+1 from the last
+    Sunday of March to the last Sunday of October, 01:00 UTC both ways."""
+    bst_start = last_sunday(local.year, 3).replace(hour=1)
+    bst_end = last_sunday(local.year, 10).replace(hour=1)
+    utc = local - timedelta(hours=1)
+    return utc if bst_start <= utc < bst_end else local
+
+
+def kickoff(date_s, time_s):
+    """Kick-off in naive UTC from the feed's UK date and time."""
+    day = parse_date(date_s or '')
+    if day is None:
+        return None
+    try:
+        hh, mm = (time_s or '').strip().split(':')[:2]
+        local = day.replace(hour=int(hh), minute=int(mm))
+    except ValueError:
+        local = day.replace(hour=23, minute=59)  # unknown time: assume a late kick-off
+    return uk_to_utc(local)
+
+
+def read_results(path):
+    """(set of (home, away) played in a league CSV, date of its last match)."""
+    played, last = set(), None
+    if not os.path.exists(path):
+        return played, last
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for row in csv.DictReader(f):
+            home = (row.get('HomeTeam') or '').strip()
+            away = (row.get('AwayTeam') or '').strip()
+            if not home or not away or not (row.get('FTHG') or '').strip():
+                continue
+            played.add((home, away))
+            day = parse_date(row.get('Date') or '')
+            if day is not None and (last is None or day > last):
+                last = day
+    return played, last
+
+
+def load_feed(path):
+    """Fixtures of the last data/fixtures.json by league code, with kick-off times."""
+    by_league = {}
+    if not os.path.exists(path):
+        return None, by_league
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            feed = json.load(f)
+    except (OSError, ValueError):
+        return None, by_league
+    for fx in feed.get('fixtures', []):
+        ko = kickoff(fx.get('date'), fx.get('time'))
+        if fx.get('div') and ko is not None:
+            by_league.setdefault(fx['div'].upper(), []).append((ko, fx['home'], fx['away']))
+    updated = None
+    try:
+        updated = datetime.strptime(feed.get('updated', ''), '%Y-%m-%dT%H:%M:%SZ')
+    except ValueError:
+        pass
+    return updated, by_league
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(state, path):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def update_pending(entry, fixtures, played, now):
+    """Finished games missing from the CSV, kept in the state entry until they appear.
+
+    The feed only lists games still to be played, so a game that finished since the
+    last feed refresh is only known from here; older than PENDING_DAYS = postponed.
+    """
+    pending = {(p['home'], p['away']): p['kickoff'] for p in entry.get('pending', [])}
+    for ko, home, away in fixtures or ():
+        if ko <= now - timedelta(hours=RESULT_DELAY_HOURS):
+            pending[(home, away)] = ko.isoformat(timespec='minutes')
+    cutoff = now - timedelta(days=PENDING_DAYS)
+    entry['pending'] = [{'kickoff': ko, 'home': home, 'away': away}
+                        for (home, away), ko in sorted(pending.items(), key=lambda kv: kv[1])
+                        if (home, away) not in played and datetime.fromisoformat(ko) >= cutoff]
+    return entry['pending']
+
+
+def plan_league(code, season, entry, fixtures, now):
+    """(due, reason) for one league: whether this run should download its CSV."""
+    played, _ = read_results(os.path.join(DATA_DIR, f'{code}_{season}.csv'))
+    pending = update_pending(entry, fixtures, played, now)
+    last_fetch = datetime.fromisoformat(entry['lastFetch']) if entry.get('lastFetch') else None
+    if last_fetch is None:
+        return True, 'never fetched'
+
+    since = now - last_fetch
+    if pending:
+        if since >= timedelta(hours=RETRY_HOURS):
+            return True, f'{len(pending)} result(s) pending'
+        return False, f'{len(pending)} result(s) pending, retry after {RETRY_HOURS}h'
+    if fixtures:
+        upcoming = [ko for ko, _, _ in fixtures if ko > now - timedelta(hours=RESULT_DELAY_HOURS)]
+        if upcoming and since < timedelta(days=MAX_INTERVAL_DAYS):
+            return False, f'next game {min(upcoming):%Y-%m-%d %H:%M}'
+
+    last_match = datetime.fromisoformat(entry['lastMatch']) if entry.get('lastMatch') else None
+    if entry.get('season') != season or last_match is None or now - last_match > timedelta(days=OFF_SEASON_DAYS):
+        interval = MAX_INTERVAL_DAYS  # off-season, or the new season has not started yet
+    else:
+        interval = min(MIN_INTERVAL_DAYS * 2 ** entry.get('unchanged', 0), MAX_INTERVAL_DAYS)
+    if since >= timedelta(days=interval):
+        return True, f'backoff {interval}d elapsed'
+    return False, f'backoff {interval}d, next after {last_fetch + timedelta(days=interval):%Y-%m-%d %H:%M}'
+
+
+def download_url(url):
     try:
         req = urllib.request.Request(url, headers={'User-Agent': 'elo-fetcher/1.0'})
         with urllib.request.urlopen(req, timeout=60) as r:
-            data = r.read()
-            with open(dest, 'wb') as f:
-                f.write(data)
-        return True, None
+            return r.read(), None
     except urllib.error.HTTPError as e:
-        return False, f'HTTP {e.code} {e.reason}'
+        return None, f'HTTP {e.code} {e.reason}'
     except Exception as e:
-        return False, str(e)
+        return None, str(e)
+
+
+def file_digest(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
 
 
 def backup_file(src):
@@ -90,42 +285,132 @@ def backup_file(src):
         return None
 
 
-def main():
-    log('Starting fetch_and_update')
-    downloaded = []
-    for url in URLS:
-        dest = local_filename_for_url(url)
-        log(f'Downloading {url} -> {dest}')
-        ok, err = download_url(url, dest)
-        if ok:
-            log(f'  OK')
-            downloaded.append(dest)
-            gz = backup_file(dest)
-            if gz:
-                log(f'  Backup created: {gz}')
-            else:
-                log(f'  Backup failed for: {dest}')
+def fetch_league(code, season, entry, now):
+    """Download one league CSV, keep it only if it changed. Returns True when it did."""
+    url = url_for(code, season)
+    dest = local_filename_for_url(url)
+    log(f'Downloading {url} -> {dest}')
+    data, err = download_url(url)
+    entry['lastFetch'] = now.isoformat(timespec='seconds')
+    if data is None:
+        log(f'  ERROR: {err}')
+        entry['unchanged'] = entry.get('unchanged', 0) + 1
+        return False
+
+    changed = hashlib.sha1(data).hexdigest() != file_digest(dest)
+    if changed:
+        tmp = dest + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, dest)
+        log('  OK (changed)')
+        gz = backup_file(dest)
+        if gz:
+            log(f'  Backup created: {gz}')
         else:
-            log(f'  ERROR: {err}')
-
-    # run generator
-    gen_script = os.path.join(ROOT, 'scripts', 'generate_matches_and_ratings.py')
-    if os.path.exists(gen_script):
-        log(f'Running generator: {gen_script}')
-        try:
-            # use same python interpreter
-            res = subprocess.run([sys.executable, gen_script], cwd=ROOT, capture_output=True, text=True, timeout=900)
-            log('Generator stdout:')
-            for line in res.stdout.splitlines():
-                log('  ' + line)
-            log('Generator stderr:')
-            for line in res.stderr.splitlines():
-                log('  ' + line)
-            log(f'Generator exit code: {res.returncode}')
-        except Exception as e:
-            log('Failed to run generator: ' + str(e))
+            log(f'  Backup failed for: {dest}')
+        entry['unchanged'] = 0
+    else:
+        log('  OK (unchanged)')
+        entry['unchanged'] = entry.get('unchanged', 0) + 1
+
+    played, last = read_results(dest)
+    entry['pending'] = [p for p in entry.get('pending', []) if (p['home'], p['away']) not in played]
+    entry['season'] = season
+    entry['lastMatch'] = last.date().isoformat() if last else None
+    return changed
+
+
+def fixtures_stale(updated, feed, now):
+    if updated is None:
+        return True
+    if now - updated > timedelta(hours=FIXTURES_MAX_AGE_HOURS):
+        return True
+    return any(ko <= now for fixtures in feed.values() for ko, _, _ in fixtures)
+
+
+def run_script(name, label, timeout=900):
+    script = os.path.join(ROOT, 'scripts', name)
+    if not os.path.exists(script):
+        log(f'{label} script not found: {script}')
+        return None
+    log(f'Running {label.lower()}: {script}')
+    try:
+        # use same python interpreter
+        res = subprocess.run([sys.executable, script], cwd=ROOT, capture_output=True, text=True, timeout=timeout)
+        log(f'{label} stdout:')
+        for line in res.stdout.splitlines():
+            log('  ' + line)
+        log(f'{label} stderr:')
+        for line in res.stderr.splitlines():
+            log('  ' + line)
+        log(f'{label} exit code: {res.returncode}')
+        return res.returncode
+    except Exception as e:
+        log(f'Failed to run {label.lower()}: ' + str(e))
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Download new league CSVs and regenerate what changed')
+    parser.add_argument('--all', action='store_true',
+                        help='fetch every league and always regenerate (no scheduling)')
+    parser.add_argument('--leagues', nargs='+', metavar='CODE', help='only consider these league codes')
+    parser.add_argument('--dry-run', action='store_true', help='print the plan without downloading')
+    args = parser.parse_args(argv)
+
+    now = datetime.utcnow().replace(microsecond=0)
+    season = season_code(now)
+    codes = [c.upper() for c in args.leagues] if args.leagues else league_codes()
+    state = load_state(STATE_FILE)
+    updated, feed = load_feed(FIXTURES_FILE)
+
+    plan = []
+    for code in codes:
+        entry = state.setdefault(code, {})
+        # season rolled over: pick up the last results of the old one once; without a
+        # recorded season (new or lost state file) the old one is the newest local CSV,
+        # or the season before this one
+        last_season = entry.get('season') or local_season(code) or previous_season(season)
+        if last_season != season and entry.get('closed') != last_season:
+            plan.append((code, last_season, 'closing previous season'))
+            entry['closed'] = last_season
+        if args.all:
+            due, reason = True, '--all'
+        else:
+            due, reason = plan_league(code, season, entry, feed.get(code), now)
+        if due:
+            plan.append((code, season, reason))
+        elif args.dry_run:
+            print(f'  skip {code}_{season}: {reason}')
+
+    if args.dry_run:
+        for code, s, reason in plan:
+            print(f'  fetch {code}_{s}: {reason}')
+        print(f'{len(plan)} download(s) for {len({c for c, _, _ in plan})} of {len(codes)} leagues (season {season})')
+        return
+
+    log(f'Starting fetch_and_update (season {season}, {len(plan)} download(s) '
+        f'for {len({c for c, _, _ in plan})} of {len(codes)} leagues)')
+    changed = []
+    for code, s, reason in plan:
+        log(f'{code}_{s}: {reason}')
+        # closing download: keep the current season's backoff untouched
+        entry = state[code] if s == season else dict(state[code])
+        if fetch_league(code, s, entry, now) or args.all:
+            changed.append(f'{code}_{s}')
+    save_state(state, STATE_FILE)
+
+    # run generator, then rebuild fixtures.json with the fresh ratings
+    if changed:
+        log(f'Changed: {", ".join(changed)}')
+        run_script('generate_matches_and_ratings.py', 'Generator')
+        run_script('generate_fixtures.py', 'Fixtures pipeline')
+    elif fixtures_stale(updated, feed, now):
+        log('No CSV changed; refreshing the fixtures feed only')
+        run_script('generate_fixtures.py', 'Fixtures pipeline')
     else:
-        log('Generator script not found: ' + gen_script)
+        log('No CSV changed and the fixtures feed is current; nothing to regenerate')
 
     log('fetch_and_update finished')
 
@@ -3,6 +3,9 @@
 Simple proxy server to fetch fixtures CSV from football-data.co.uk and serve with CORS headers.
 Usage: py -3 scripts\fixture_proxy.py
 Serves on http://localhost:5000/fixtures
+Club name lookup: http://localhost:5000/resolve?name=Man%20United (repeat name= for a batch)
+SQLite store (generator --sqlite): /db/matches?club=&league=&from=&to=&limit= and /db/ratings?club=
+Change feed: /changes?since=N (matches and ratings changed after version N)
 """
 import http.server
 import socketserver
@@ -12,6 +15,11 @@ import subprocess
 import json
 import os
 import sys
+from urllib.parse import urlsplit, parse_qs
+
+from club_matcher import ClubMatcher, CLUBS_FILE
+import change_feed
+import store
 
 PORT = 5000
 REMOTE_URL = 'https://www.football-data.co.uk/fixtures.csv'
@@ -20,9 +28,64 @@ PROJECT_ROOT = os.path.dirname(ROOT)
 FETCH_SCRIPT = os.path.join(PROJECT_ROOT, 'scripts', 'fetch_and_update.py')
 LOG_FILE = os.path.join(PROJECT_ROOT, 'scripts', 'fetch_and_update.log')
 
+_matcher = None
+_matcher_mtime = None
+
+
+def get_matcher():
+    # rebuild the index only when clubs.json changes on disk
+    global _matcher, _matcher_mtime
+    mtime = os.path.getmtime(CLUBS_FILE)
+    if _matcher is None or mtime != _matcher_mtime:
+        _matcher = ClubMatcher.from_file(CLUBS_FILE)
+        _matcher_mtime = mtime
+    return _matcher
+
+
 class ProxyHandler(http.server.BaseHTTPRequestHandler):
+    def send_json(self, status, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
     def do_GET(self):
-        if self.path.startswith('/fixtures'):
+        if self.path.startswith('/resolve'):
+            query = parse_qs(urlsplit(self.path).query)
+            names = query.get('name') or []
+            if not names:
+                self.send_json(400, {'error': 'missing name parameter'})
+                return
+            try:
+                limit = int(query.get('limit', ['5'])[0])
+            except ValueError:
+                limit = 0
+            if limit < 1:
+                self.send_json(400, {'error': 'limit must be a positive integer'})
+                return
+            try:
+                self.send_json(200, get_matcher().match_many(names, limit=limit))
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+        elif self.path.startswith('/db/'):
+            self.handle_db()
+        elif self.path.startswith('/changes'):
+            query = parse_qs(urlsplit(self.path).query)
+            try:
+                since = int(query.get('since', ['0'])[0])
+            except ValueError:
+                self.send_json(400, {'error': 'since must be a version number'})
+                return
+            try:
+                changes = change_feed.changes_since(since)
+                if changes is None:
+                    self.send_json(404, {'error': 'change feed not found, run the generator first'})
+                else:
+                    self.send_json(200, changes)
+            except Exception as e:
+                self.send_json(500, {'error': str(e)})
+        elif self.path.startswith('/fixtures'):
             try:
                 with urllib.request.urlopen(REMOTE_URL, timeout=20) as resp:
                     data = resp.read()
@@ -79,6 +142,40 @@ class ProxyHandler(http.server.BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(b'Not found')
 
+    def handle_db(self):
+        if not os.path.exists(store.DB_FILE):
+            self.send_json(404, {'error': 'store not found, run the generator with --sqlite'})
+            return
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        try:
+            limit = int(query.get('limit', '100'))
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            self.send_json(400, {'error': 'limit must be a positive integer'})
+            return
+        try:
+            conn = store.connect(store.DB_FILE, readonly=True)
+            try:
+                club = int(query['club']) if 'club' in query else None
+                if parts.path == '/db/matches':
+                    rows = store.club_matches(conn, club, query.get('league'), query.get('from'),
+                                             query.get('to'), min(limit, 1000))
+                elif parts.path == '/db/ratings':
+                    rows = [dict(r) for r in store.latest_snapshots(conn)
+                            if club is None or r['club_id'] == club]
+                else:
+                    self.send_json(404, {'error': 'unknown endpoint'})
+                    return
+            finally:
+                conn.close()
+            self.send_json(200, rows)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': str(e)})
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
@@ -87,9 +184,14 @@ class ProxyHandler(http.server.BaseHTTPRequestHandler):
         self.end_headers()
 
 
+def create_server(host='0.0.0.0', port=PORT):
+    # also used by loadtest_proxy.py, so load tests measure the server we actually run
+    return socketserver.TCPServer((host, port), ProxyHandler)
+
+
 if __name__ == '__main__':
     print(f'Starting proxy on http://localhost:{PORT} -> {REMOTE_URL}')
-    with socketserver.TCPServer(('0.0.0.0', PORT), ProxyHandler) as httpd:
+    with create_server() as httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
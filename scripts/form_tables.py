@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Rolling form windows and head-to-head aggregates, built during the rating pass.
+
+FormTracker.add() is called by the generator for every rated match, in date
+order, and keeps:
+
+  - per club, the last FORM_WINDOW home matches and the last FORM_WINDOW away
+    matches as [date, opponent, goalsFor, goalsAgainst, eloDelta]
+    (eloDelta is the home/away Elo change, as getEloTrend in
+    js/fixtures_round.js uses it)
+  - per club pair, the record of all their meetings plus the last
+    H2H_RECENT ones
+
+and writes two lookup files, so a fixture's form and head-to-head summary
+is one keyed read:
+
+    data/form.json   {window, clubs: {clubId: {home: {...}, away: {...}}}}
+    data/h2h.json    {recent, pairs: {"lowId-highId": {...}}}
+
+Pair records are stored from the lower club id's side; h2h_summary()
+orients one for a given home and away club.
+"""
+import json
+import os
+from collections import defaultdict, deque
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+FORM_FILE = os.path.join(DATA_DIR, 'form.json')
+H2H_FILE = os.path.join(DATA_DIR, 'h2h.json')
+
+FORM_WINDOW = 5
+H2H_RECENT = 5
+
+
+def pair_key(a, b):
+    return f'{min(a, b)}-{max(a, b)}'
+
+
+def result_letter(goals_for, goals_against):
+    return 'W' if goals_for > goals_against else 'D' if goals_for == goals_against else 'L'
+
+
+def side_summary(entries):
+    """Form of one club on one side from its window entries (oldest first)."""
+    return {
+        'results': ''.join(result_letter(e[2], e[3]) for e in entries),
+        'goalsFor': sum(e[2] for e in entries),
+        'goalsAgainst': sum(e[3] for e in entries),
+        'eloTrend': round(sum(e[4] for e in entries) / len(entries), 2),
+        'matches': list(entries),
+    }
+
+
+class FormTracker:
+    def __init__(self, window=FORM_WINDOW, recent=H2H_RECENT):
+        self.window = window
+        self.recent = recent
+        self.home = defaultdict(lambda: deque(maxlen=window))
+        self.away = defaultdict(lambda: deque(maxlen=window))
+        self.pairs = {}
+
+    def add(self, m):
+        hid, aid = m['home'], m['away']
+        hg, ag = m['homeGoals'], m['awayGoals']
+        day = (m.get('date') or '')[:10] or None
+        self.home[hid].append([day, aid, hg, ag, round(m['homeEloPost'] - m['homeEloPre'], 2)])
+        self.away[aid].append([day, hid, ag, hg, round(m['awayEloPost'] - m['awayEloPre'], 2)])
+
+        key = pair_key(hid, aid)
+        rec = self.pairs.get(key)
+        if rec is None:
+            # wins and goals are [lower id, higher id]
+            rec = self.pairs[key] = {'matches': 0, 'wins': [0, 0], 'draws': 0, 'goals': [0, 0],
+                                     'last': deque(maxlen=self.recent)}
+        low_goals, high_goals = (hg, ag) if hid < aid else (ag, hg)
+        rec['matches'] += 1
+        rec['goals'][0] += low_goals
+        rec['goals'][1] += high_goals
+        if low_goals == high_goals:
+            rec['draws'] += 1
+        else:
+            rec['wins'][0 if low_goals > high_goals else 1] += 1
+        rec['last'].append([day, hid, aid, hg, ag])
+
+    def form(self):
+        clubs = {}
+        for side, windows in (('home', self.home), ('away', self.away)):
+            for cid, entries in windows.items():
+                clubs.setdefault(str(cid), {})[side] = side_summary(entries)
+        return {'window': self.window, 'clubs': clubs}
+
+    def h2h(self):
+        pairs = {key: dict(rec, last=list(rec['last'])) for key, rec in self.pairs.items()}
+        return {'recent': self.recent, 'pairs': pairs}
+
+    def write(self, form_path=FORM_FILE, h2h_path=H2H_FILE):
+        with open(form_path, 'w', encoding='utf-8') as f:
+            json.dump(self.form(), f, separators=(',', ':'))
+        with open(h2h_path, 'w', encoding='utf-8') as f:
+            json.dump(self.h2h(), f, separators=(',', ':'))
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def club_form(form, club_id, side):
+    """Home or away form of a club from form.json, or None."""
+    return form['clubs'].get(str(club_id), {}).get(side)
+
+
+def h2h_summary(h2h, home_id, away_id):
+    """Head-to-head record from the point of view of a fixture's home club, or None."""
+    rec = h2h['pairs'].get(pair_key(home_id, away_id))
+    if rec is None:
+        return None
+    home_low = home_id < away_id
+    home_idx, away_idx = (0, 1) if home_low else (1, 0)
+    return {
+        'matches': rec['matches'],
+        'homeClubWins': rec['wins'][home_idx],
+        'draws': rec['draws'],
+        'awayClubWins': rec['wins'][away_idx],
+        'homeClubGoals': rec['goals'][home_idx],
+        'awayClubGoals': rec['goals'][away_idx],
+        'last': rec['last'],
+    }
@@ -1,8 +1,16 @@
+import argparse
 import csv
 import glob
 import json
 import os
 
+from corpus_cache import CorpusCache
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+OUT_GENERATED = os.path.join(DATA_DIR, 'generated_clubs.json')
+OUT_CLUBS = os.path.join(DATA_DIR, 'clubs.json')
+PARSE_VERSION = 1  # bump when read_team_names() changes, to invalidate data/cache/clubs
+
 league_map = {
     'E0': 'Premier League',
     'E1': 'Championship',
@@ -16,55 +24,73 @@ league_map = {
     'D2': 'Bundesliga 2'
 }
 
-files = sorted(glob.glob('data/*.csv'))
-teams = {}
 
-for f in files:
-    base = os.path.basename(f)
-    code = base.split('_')[0]
-    league = league_map.get(code, code)
+def read_team_names(path):
+    """Distinct home/away team names of one CSV, in order of appearance."""
+    names = {}
+    error = None
     try:
-        with open(f, encoding='utf-8') as fh:
+        with open(path, encoding='utf-8') as fh:
             reader = csv.DictReader(fh)
             for row in reader:
                 home = row.get('HomeTeam') or row.get('Home') or row.get('HomeTeam ')
                 away = row.get('AwayTeam') or row.get('Away') or row.get('AwayTeam ')
-                if home:
-                    name = home.strip()
-                    if name:
-                        if name not in teams:
-                            teams[name] = { 'name': name, 'leagues': set(), 'continent': 'Europe' }
-                        teams[name]['leagues'].add(league)
-                if away:
-                    name = away.strip()
-                    if name:
-                        if name not in teams:
-                            teams[name] = { 'name': name, 'leagues': set(), 'continent': 'Europe' }
-                        teams[name]['leagues'].add(league)
+                for team in (home, away):
+                    if team:
+                        name = team.strip()
+                        if name:
+                            names[name] = None
     except Exception as e:
-        print(f"Failed to read {f}: {e}")
+        error = str(e)
+    return {'names': list(names), 'error': error}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild data/clubs.json from the team names in data/*.csv')
+    parser.add_argument('--no-cache', action='store_true', help='parse every CSV instead of reusing data/cache/')
+    args = parser.parse_args(argv)
+
+    files = sorted(glob.glob(os.path.join(DATA_DIR, '*.csv')))
+    teams = {}
+    cache = CorpusCache('clubs', version=PARSE_VERSION, enabled=not args.no_cache)
+
+    for f in files:
+        base = os.path.basename(f)
+        code = base.split('_')[0]
+        league = league_map.get(code, code)
+        parsed = cache.load(f, read_team_names)
+        for name in parsed['names']:
+            if name not in teams:
+                teams[name] = { 'name': name, 'leagues': set(), 'continent': 'Europe' }
+            teams[name]['leagues'].add(league)
+        if parsed['error']:
+            print(f"Failed to read {f}: {parsed['error']}")
+
+    # Build clubs array with an id and primary league
+    clubs = []
+    next_id = 1
+    for name in sorted(teams.keys()):
+        leagues = sorted(teams[name]['leagues'])
+        primary_league = leagues[0] if leagues else ''
+        clubs.append({
+            'id': next_id,
+            'name': name,
+            'league': primary_league,
+            'continent': teams[name]['continent']
+        })
+        next_id += 1
+
+    # Write generated file
+    with open(OUT_GENERATED, 'w', encoding='utf-8') as out:
+        json.dump(clubs, out, ensure_ascii=False, indent=2)
 
-# Build clubs array with an id and primary league
-clubs = []
-next_id = 1
-for name in sorted(teams.keys()):
-    leagues = sorted(teams[name]['leagues'])
-    primary_league = leagues[0] if leagues else ''
-    clubs.append({
-        'id': next_id,
-        'name': name,
-        'league': primary_league,
-        'continent': teams[name]['continent']
-    })
-    next_id += 1
+    # Also overwrite data/clubs.json
+    with open(OUT_CLUBS, 'w', encoding='utf-8') as out:
+        json.dump(clubs, out, ensure_ascii=False, indent=2)
 
-# Write generated file
-out_path = 'data/generated_clubs.json'
-with open(out_path, 'w', encoding='utf-8') as out:
-    json.dump(clubs, out, ensure_ascii=False, indent=2)
+    print(cache.summary())
+    print(f"Wrote {len(clubs)} clubs to data/clubs.json")
 
-# Also overwrite data/clubs.json
-with open('data/clubs.json', 'w', encoding='utf-8') as out:
-    json.dump(clubs, out, ensure_ascii=False, indent=2)
 
-print(f"Wrote {len(clubs)} clubs to data/clubs.json")
+if __name__ == '__main__':
+    main()
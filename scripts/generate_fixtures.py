@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Build data/fixtures.json with precomputed predictions for the upcoming round.
+
+Fetches the football-data.co.uk fixtures feed, resolves both clubs of every
+fixture (exact name first, then club_matcher), attaches the home/away ratings
+from ratings_home_away.json and computes, in one batch, everything the round
+page used to compute per fixture in the browser:
+
+  - Elo probabilities (same draw curve as js/fixtures_round.js)
+  - Poisson score grid and odds from the league's matches priced like the
+    fixture (B365H/B365A window in market_index.json, for every range the
+    page offers) or, without odds, from its matches in the home/away Elo range
+  - the same analysis restricted to the two clubs, and confidence levels
+  - recent home/away form and Elo trend of both clubs and their
+    head-to-head record (form.json / h2h.json from the generator)
+  - score grid and 1X2 from the fitted goal model (goal_model.py), one
+    vectorized call per league for the whole round
+
+Runs after the generator from fetch_and_update.py, or manually:
+
+    python scripts/generate_fixtures.py            # fetch the feed
+    python scripts/generate_fixtures.py fixtures.csv   # use a local copy
+"""
+import bisect
+import csv
+import io
+import json
+import math
+import os
+import sys
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+import form_tables
+import match_extras
+from club_matcher import ClubMatcher
+from leagues import league_code
+from market_index import MarketIndex
+from generate_matches_and_ratings import BASE_ELO, expected_home
+
+try:
+    import goal_model
+except ImportError:  # numpy is optional: without it the goal model is skipped
+    goal_model = None
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CLUBS_FILE = os.path.join(DATA_DIR, 'clubs.json')
+MATCHES_FILE = os.path.join(DATA_DIR, 'matches_full.json')
+RATINGS_HA_FILE = os.path.join(DATA_DIR, 'ratings_home_away.json')
+GOAL_MODEL_FILE = os.path.join(DATA_DIR, 'goal_model.json')
+FORM_FILE = os.path.join(DATA_DIR, 'form.json')
+H2H_FILE = os.path.join(DATA_DIR, 'h2h.json')
+MARKET_INDEX_FILE = os.path.join(DATA_DIR, 'market_index.json')
+EXTRAS_FILE = os.path.join(DATA_DIR, 'match_extras.json')
+OUT_FIXTURES = os.path.join(DATA_DIR, 'fixtures.json')
+
+FIXTURES_URL = 'https://www.football-data.co.uk/fixtures.csv'
+
+# defaults of CURRENT_ELO_RANGE / CURRENT_MARKET_RANGE in js/fixtures_round.js
+ELO_RANGES = (50, 50, 100)
+MARKET_RANGE = 0.05
+# every CURRENT_MARKET_RANGE the page offers (2%, 3% or 5%)
+MARKET_RANGES = (0.02, 0.03, 0.05)
+MAX_GOALS = 5
+RESOLVE_CUTOFF = 0.8
+
+
+def draw_probability(home_elo, away_elo):
+    return min(0.35, max(0.10, 0.30 - 0.00075 * abs(home_elo - away_elo)))
+
+
+def elo_outcome_probs(home_elo, away_elo):
+    exp_h = expected_home(home_elo, away_elo)
+    draw = draw_probability(home_elo, away_elo)
+    return exp_h * (1 - draw), draw, (1 - exp_h) * (1 - draw)
+
+
+def poisson_pmf(k, lam):
+    if lam == 0:
+        return 1.0 if k == 0 else 0.0
+    return lam ** k * math.exp(-lam) / math.factorial(k)
+
+
+def mean_std(values):
+    mean = sum(values) / len(values)
+    var = sum((v - mean) ** 2 for v in values) / len(values)
+    return mean, math.sqrt(var)
+
+
+def odds_with_poisson(home_goals, away_goals):
+    """Port of calculateOddsWithPoisson: goal means -> 1X2 over a 0..5 grid."""
+    if not home_goals or not away_goals:
+        return None
+    result = poisson_odds(*mean_std(home_goals), *mean_std(away_goals))
+    result['sampleSize'] = len(home_goals) + len(away_goals)
+    return result
+
+
+def poisson_odds(h_mean, h_std, a_mean, a_std):
+    """1X2, odds and score grid of independent Poisson goals with these means."""
+    h_pmf = [poisson_pmf(k, h_mean) for k in range(MAX_GOALS + 1)]
+    a_pmf = [poisson_pmf(k, a_mean) for k in range(MAX_GOALS + 1)]
+    grid = [[hp * ap for ap in a_pmf] for hp in h_pmf]
+    total = sum(map(sum, grid))
+    home = sum(grid[i][j] for i in range(MAX_GOALS + 1) for j in range(i))
+    draw = sum(grid[i][i] for i in range(MAX_GOALS + 1))
+    away = total - home - draw
+    home, draw, away = home / total, draw / total, away / total
+    return {
+        'homeProb': home,
+        'drawProb': draw,
+        'awayProb': away,
+        'homeOdd': 1 / home if home > 0 else None,
+        'drawOdd': 1 / draw if draw > 0 else None,
+        'awayOdd': 1 / away if away > 0 else None,
+        'stdDevConfidence': max(5, min(85, 85 - ((h_std + a_std) / 2) * 10)),
+        'homeGoalsMean': h_mean,
+        'awayGoalsMean': a_mean,
+        'homeGoalsStdDev': h_std,
+        'awayGoalsStdDev': a_std,
+        'scoreGrid': [[round(p / total, 5) for p in row] for row in grid],
+    }
+
+
+def calculate_confidence(sample_size):
+    """Port of calculateConfidence (sample-size benchmarks)."""
+    if sample_size == 0:
+        return 5
+    if sample_size < 3:
+        confidence = 15 + (sample_size / 3) * 10
+    elif sample_size < 10:
+        confidence = 25 + ((sample_size - 3) / 7) * 20
+    elif sample_size < 50:
+        confidence = 45 + ((sample_size - 10) / 40) * 20
+    elif sample_size < 100:
+        confidence = 65 + ((sample_size - 50) / 50) * 10
+    elif sample_size < 300:
+        confidence = 75 + ((sample_size - 100) / 200) * 8
+    else:
+        confidence = 83
+    return max(5, min(85, confidence))
+
+
+def confidence_for(result):
+    if not result:
+        return calculate_confidence(0)
+    sample = result.get('sampleSize') or 0
+    if result.get('stdDevConfidence') is None:
+        return calculate_confidence(sample)
+    combined = calculate_confidence(sample) * 0.7 + result['stdDevConfidence'] * 0.3
+    return max(5, min(83, combined))
+
+
+class LeagueHistory:
+    """Matches of one league sorted by home Elo, and each club's priced matches.
+
+    The Elo ordering turns the "similar matches" scan of the round page into
+    a bisect for one bound plus a filter over the (small) window it returns;
+    the per-club lists (matches with B365 closing odds) serve the club side
+    of the market-odds analysis, whose league side is market_index.json.
+    """
+
+    def __init__(self, rows):
+        self.by_elo = sorted(rows, key=lambda m: m['homeEloPre'])
+        self.elo_keys = [m['homeEloPre'] for m in self.by_elo]
+        self.home_priced = defaultdict(list)
+        self.away_priced = defaultdict(list)
+        for m in rows:
+            if m.get('oddH') and m.get('oddA'):
+                self.home_priced[m['home']].append(m)
+                self.away_priced[m['away']].append(m)
+
+    def similar_by_elo(self, home_elo, away_elo, elo_range):
+        lo = bisect.bisect_left(self.elo_keys, home_elo - elo_range)
+        hi = bisect.bisect_right(self.elo_keys, home_elo + elo_range)
+        return [m for m in self.by_elo[lo:hi] if abs(m['awayEloPre'] - away_elo) <= elo_range]
+
+    def club_priced(self, home_id, away_id, prob_h, prob_a, prob_range):
+        """Home club's home matches and away club's away matches priced within ±prob_range."""
+        h_min, h_max = max(0.01, prob_h - prob_range), min(0.99, prob_h + prob_range)
+        a_min, a_max = max(0.01, prob_a - prob_range), min(0.99, prob_a + prob_range)
+        rows = self.home_priced.get(home_id, []) + self.away_priced.get(away_id, [])
+        return [m for m in rows if h_min <= 1 / m['oddH'] <= h_max and a_min <= 1 / m['oddA'] <= a_max]
+
+
+def team_result(home_id, away_id, similar):
+    home_rows = [m for m in similar if m['home'] == home_id]
+    away_rows = [m for m in similar if m['away'] == away_id]
+    if not home_rows or not away_rows:
+        return None
+    return odds_with_poisson([m['homeGoals'] for m in home_rows], [m['awayGoals'] for m in away_rows])
+
+
+def league_result(similar, **extra):
+    result = odds_with_poisson([m['homeGoals'] for m in similar], [m['awayGoals'] for m in similar])
+    if result:
+        result['sampleSize'] = len(similar)
+        result.update(extra)
+    return result
+
+
+def range_key(prob_range):
+    """Key of a market range in prediction['market'] (String(range) in the page)."""
+    return f'{prob_range:g}'
+
+
+def market_analysis(index, history, code, home_id, away_id, odd_h, odd_a, prob_range):
+    """League and club analysis of the matches priced like the fixture.
+
+    The league side is one MarketIndex window (doubled when empty, as
+    calculateOddsFromMarketOdds did); None when the league has no priced
+    match in either window.
+    """
+    for i, rng in enumerate((prob_range, prob_range * 2)):
+        stats = index.query(code, odd_h, odd_a, rng)
+        if stats:
+            break
+    else:
+        return None
+    league = poisson_odds(stats['homeGoalsMean'], stats['homeGoalsStdDev'],
+                          stats['awayGoalsMean'], stats['awayGoalsStdDev'])
+    league.update(sampleSize=stats['sampleSize'], source='market-odds',
+                  rangeExpanded=f'±{rng * 100:.0f}%' if i else False)
+    team = None
+    if history is not None:
+        team = team_result(home_id, away_id, history.club_priced(home_id, away_id, 1 / odd_h, 1 / odd_a, rng))
+    return {'league': league, 'team': team}
+
+
+def predict(home_id, away_id, home_elo, away_elo, history, market=None):
+    """Everything the round page shows for one fixture.
+
+    market is {range_key(range): market_analysis(...)} for the MARKET_RANGES
+    (empty without odds); the one at MARKET_RANGE, when there is one, is the
+    league/team analysis, otherwise the league's matches in the Elo range are.
+    """
+    p_home, p_draw, p_away = elo_outcome_probs(home_elo, away_elo)
+    out = {
+        'elo': {'homeProb': p_home, 'drawProb': p_draw, 'awayProb': p_away},
+        'league': None,
+        'team': None,
+        'market': market or {},
+        'eloRange': ELO_RANGES[0],
+        'marketRange': MARKET_RANGE,
+    }
+    league = team = None
+    current = out['market'].get(range_key(MARKET_RANGE))
+    if current:
+        league, team = current['league'], current['team']
+    elif history is not None:
+        for i, rng in enumerate(ELO_RANGES):
+            similar = history.similar_by_elo(home_elo, away_elo, rng)
+            if similar:
+                league = league_result(similar, source='elo-range', rangeExpanded=f'±{rng}' if i else False)
+                team = team_result(home_id, away_id, similar)
+                break
+
+    out['league'] = league
+    out['confidence'] = confidence_for(league)
+    if league and team:
+        team['rangeExpanded'] = False
+        out['team'] = team
+        out['teamConfidence'] = confidence_for(team)
+    return out
+
+
+def parse_number(s):
+    try:
+        v = float(s)
+        return v if v > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+
+def read_fixtures(source=None):
+    if source and os.path.exists(source):
+        with open(source, 'r', encoding='utf-8-sig', errors='replace') as f:
+            text = f.read()
+    else:
+        req = urllib.request.Request(source or FIXTURES_URL, headers={'User-Agent': 'elo-fetcher/1.0'})
+        with urllib.request.urlopen(req, timeout=60) as r:
+            text = r.read().decode('utf-8-sig', errors='replace')
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        home = (row.get('HomeTeam') or '').strip()
+        away = (row.get('AwayTeam') or '').strip()
+        if home and away:
+            rows.append(row)
+    return rows
+
+
+def load_history(path=MATCHES_FILE, extras_path=EXTRAS_FILE):
+    """Per-league LeagueHistory of the rated matches (with their closing odds)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        matches = json.load(f)
+    match_extras.attach(matches, extras_path)
+    by_league = defaultdict(list)
+    for m in matches:
+        if m.get('homeEloPre') is None or m.get('awayEloPre') is None:
+            continue
+        by_league[league_code(m.get('source'))].append(m)
+    return {code: LeagueHistory(rows) for code, rows in by_league.items()}
+
+
+def attach_model_predictions(fixtures, model):
+    """Goal-model grid for every predicted fixture, batched per league."""
+    by_league = defaultdict(list)
+    for fx in fixtures:
+        if 'prediction' in fx and fx['div'] in model.leagues:
+            by_league[fx['div']].append(fx)
+    for code, rows in by_league.items():
+        grids = model.score_matrix(code, [fx['homeId'] for fx in rows], [fx['awayId'] for fx in rows])
+        lam, mu = model.expected_goals(code, [fx['homeId'] for fx in rows], [fx['awayId'] for fx in rows])
+        home, draw, away = goal_model.outcome_probs(grids)
+        for i, fx in enumerate(rows):
+            fx['prediction']['model'] = {
+                'homeProb': float(home[i]),
+                'drawProb': float(draw[i]),
+                'awayProb': float(away[i]),
+                'homeGoals': round(float(lam[i]), 3),
+                'awayGoals': round(float(mu[i]), 3),
+                'scoreGrid': grids[i, :MAX_GOALS + 1, :MAX_GOALS + 1].round(5).tolist(),
+            }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    source = argv[0] if argv else None
+
+    with open(CLUBS_FILE, 'r', encoding='utf-8') as f:
+        clubs = json.load(f)
+    with open(RATINGS_HA_FILE, 'r', encoding='utf-8') as f:
+        ratings = {r['clubId']: r for r in json.load(f)}
+    clubs_by_id = {c['id']: c for c in clubs}
+    matcher = ClubMatcher(clubs)
+
+    leagues = load_history(MATCHES_FILE, EXTRAS_FILE)
+    market = MarketIndex.load(MARKET_INDEX_FILE) if os.path.exists(MARKET_INDEX_FILE) else None
+    form = form_tables.load(FORM_FILE) if os.path.exists(FORM_FILE) else None
+    h2h = form_tables.load(H2H_FILE) if os.path.exists(H2H_FILE) else None
+    raw = read_fixtures(source)
+
+    fixtures = []
+    unresolved = set()
+    for row in raw:
+        home, away = row['HomeTeam'].strip(), row['AwayTeam'].strip()
+        hid = matcher.resolve(home, cutoff=RESOLVE_CUTOFF)
+        aid = matcher.resolve(away, cutoff=RESOLVE_CUTOFF)
+        if hid is None:
+            unresolved.add(home)
+        if aid is None:
+            unresolved.add(away)
+
+        # no Div: leave the league unknown rather than guess it from clubs.json,
+        # whose league goes stale after promotion and relegation
+        code = (row.get('Div') or '').strip().upper() or None
+        odd_h = parse_number(row.get('B365H'))
+        odd_d = parse_number(row.get('B365D'))
+        odd_a = parse_number(row.get('B365A'))
+
+        fixture = {
+            'home': home,
+            'away': away,
+            'date': (row.get('Date') or '').strip(),
+            'time': (row.get('Time') or '').strip(),
+            'div': code,
+            'oddH': odd_h,
+            'oddD': odd_d,
+            'oddA': odd_a,
+            'homeId': hid,
+            'awayId': aid,
+        }
+        if hid is not None and aid is not None:
+            home_elo = ratings.get(hid, {}).get('homeElo', BASE_ELO)
+            away_elo = ratings.get(aid, {}).get('awayElo', BASE_ELO)
+            fixture['homeElo'] = home_elo
+            fixture['awayElo'] = away_elo
+            fixture['league'] = clubs_by_id[hid].get('league')
+            history = leagues.get(code)
+            analyses = {}
+            if market is not None and odd_h and odd_a:
+                analyses = {range_key(rng): market_analysis(market, history, code, hid, aid, odd_h, odd_a, rng)
+                            for rng in MARKET_RANGES}
+            prediction = predict(hid, aid, home_elo, away_elo, history, analyses)
+            if form is not None:
+                home_form = form_tables.club_form(form, hid, 'home')
+                away_form = form_tables.club_form(form, aid, 'away')
+                prediction['homeTrend'] = home_form['eloTrend'] if home_form else None
+                prediction['awayTrend'] = away_form['eloTrend'] if away_form else None
+                prediction['homeForm'] = home_form
+                prediction['awayForm'] = away_form
+            if h2h is not None:
+                prediction['h2h'] = form_tables.h2h_summary(h2h, hid, aid)
+            fixture['prediction'] = prediction
+        fixtures.append(fixture)
+
+    if goal_model is not None and os.path.exists(GOAL_MODEL_FILE):
+        attach_model_predictions(fixtures, goal_model.GoalModel.load(GOAL_MODEL_FILE))
+
+    out = {
+        'updated': datetime.utcnow().replace(microsecond=0).isoformat() + 'Z',
+        'count': len(fixtures),
+        'fixtures': fixtures,
+    }
+    with open(OUT_FIXTURES, 'w', encoding='utf-8') as f:
+        json.dump(out, f, ensure_ascii=False)
+
+    predicted = sum(1 for fx in fixtures if 'prediction' in fx)
+    print(f'Wrote {len(fixtures)} fixtures ({predicted} with predictions) to {OUT_FIXTURES}')
+    if unresolved:
+        print(f'Unresolved club names ({len(unresolved)}): {", ".join(sorted(unresolved))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,44 +1,57 @@
 #!/usr/bin/env python3
+import argparse
 import csv
 import json
 import glob
-import unicodedata
-import re
 import os
 from datetime import datetime
 from collections import defaultdict
-import difflib
+
+from club_matcher import ClubMatcher, normalize
+from elo import BASE_ELO, HOME_ADV, K, SHRINKAGE_TAU
+import change_feed
+import corpus_cache
+import form_tables
+import leaderboards
+import market_index
+import match_extras
+import store
+import streaming
+
+# numpy is optional: without it the goal model and Glicko-2 are skipped
+try:
+    import goal_model
+except ImportError:
+    goal_model = None
+try:
+    import glicko2
+except ImportError:
+    glicko2 = None
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 CLUBS_FILE = os.path.join(DATA_DIR, 'clubs.json')
 OUT_MATCHES = os.path.join(DATA_DIR, 'matches_full.json')
+OUT_MATCH_EXTRAS = os.path.join(DATA_DIR, 'match_extras.json')
 OUT_RATINGS = os.path.join(DATA_DIR, 'ratings.json')
 OUT_RATINGS_HA = os.path.join(DATA_DIR, 'ratings_home_away.json')
 OUT_UNMAPPED = os.path.join(DATA_DIR, 'unmapped_names.json')
-
-BASE_ELO = 1800
-K = 35
-HOME_ADV = 100
-SHRINKAGE_TAU = 30  # parâmetro para blendar com overall quando poucos jogos
+OUT_GOAL_MODEL = os.path.join(DATA_DIR, 'goal_model.json')
+OUT_MARKET_INDEX = os.path.join(DATA_DIR, 'market_index.json')
+OUT_CHANGES = os.path.join(DATA_DIR, 'changes')
+OUT_MATCHES_NDJSON = os.path.join(DATA_DIR, 'matches_full.ndjson')
+OUT_FORM = os.path.join(DATA_DIR, 'form.json')
+OUT_H2H = os.path.join(DATA_DIR, 'h2h.json')
+OUT_LEADERBOARDS = os.path.join(DATA_DIR, 'leaderboards')
+
+SUGGEST_CUTOFF = 0.7  # minimum difflib ratio for unmapped-name suggestions
+STREAM_MAX_ROWS = 100000  # --stream: parsed matches per in-memory sorted run
+PARSE_VERSION = 1  # bump when parse_csv() changes, to invalidate data/cache/ratings
 
 DATE_FORMATS = [
     '%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%Y %H:%M', '%Y/%m/%d'
 ]
 
 
-def normalize(name):
-    if not name:
-        return ''
-    # NFKD/NFD to separate accents
-    n = unicodedata.normalize('NFD', name)
-    # remove diacritics
-    n = ''.join(ch for ch in n if unicodedata.category(ch) != 'Mn')
-    # remove punctuation except spaces
-    n = re.sub(r"[\.\'\",:;\-\(\)\[\]/]", '', n)
-    n = n.strip().lower()
-    return n
-
-
 def parse_date(s):
     if not s:
         return None
@@ -65,6 +78,15 @@ def parse_date(s):
         return None
 
 
+def parse_odd(s):
+    # decimal odds, None when missing or not a usable price
+    try:
+        v = float(s)
+    except (TypeError, ValueError):
+        return None
+    return v if v > 1 else None
+
+
 def expected_home(homeElo, awayElo):
     homeAdj = homeElo + HOME_ADV
     return 1 / (1 + 10 ** (-(homeAdj - awayElo) / 400))
@@ -118,7 +140,114 @@ def update_elo_no_homeadv(homePre, awayPre, homeGoals, awayGoals):
     return homePre + homeDelta, awayPre + awayDelta, homeDelta, awayDelta
 
 
-def main():
+def parse_csv(p, norm_to_id):
+    """Resolved rows of one CSV as compact tuples, plus its unmapped names and skipped count.
+
+    The result only depends on the file and the name table, so it is cached
+    by corpus_cache between runs.
+    """
+    rows = []
+    unmapped = set()
+    skipped = 0
+    error = None
+    try:
+        with open(p, 'r', encoding='utf-8') as fh:
+            reader = csv.DictReader(fh)
+            for row in reader:
+                date_s = row.get('Date') or row.get('date')
+                home = row.get('HomeTeam') or row.get('Home') or row.get('home')
+                away = row.get('AwayTeam') or row.get('Away') or row.get('away')
+                fthg = row.get('FTHG') or row.get('HomeGoals') or row.get('FTHG')
+                ftag = row.get('FTAG') or row.get('AwayGoals') or row.get('FTAG')
+
+                if not home or not away:
+                    skipped += 1
+                    continue
+                hid = norm_to_id.get(normalize(home))
+                aid = norm_to_id.get(normalize(away))
+                if not hid:
+                    unmapped.add(home)
+                if not aid:
+                    unmapped.add(away)
+                if not hid or not aid:
+                    skipped += 1
+                    continue
+
+                try:
+                    hg = int(fthg) if fthg is not None and fthg != '' else 0
+                except Exception:
+                    hg = 0
+                try:
+                    ag = int(ftag) if ftag is not None and ftag != '' else 0
+                except Exception:
+                    ag = 0
+
+                rows.append((date_s, parse_date(date_s), hid, aid, hg, ag,
+                             parse_odd(row.get('B365H')), parse_odd(row.get('B365D')), parse_odd(row.get('B365A'))))
+    except Exception as e:
+        # keep the rows read before the error, as before
+        error = str(e)
+    return {'rows': rows, 'unmapped': sorted(unmapped), 'skipped': skipped, 'error': error}
+
+
+def read_matches(csv_files, norm_to_id, unmapped, counts, cache):
+    """Yield one match dict per usable CSV row; updates `unmapped` and the processed/skipped counts."""
+    for p in csv_files:
+        parsed = cache.load(p, lambda path: parse_csv(path, norm_to_id))
+        if parsed['error']:
+            print('Failed to read', p, parsed['error'])
+        unmapped.update(parsed['unmapped'])
+        counts['skipped'] += parsed['skipped']
+        counts['processed'] += len(parsed['rows'])
+        source = os.path.basename(p)
+        for date_s, dt, hid, aid, hg, ag, odd_h, odd_d, odd_a in parsed['rows']:
+            yield {
+                'date_raw': date_s,
+                'date': dt.isoformat() if dt else None,
+                'date_obj': dt,
+                'home': hid,
+                'away': aid,
+                'homeGoals': hg,
+                'awayGoals': ag,
+                'oddH': odd_h,
+                'oddD': odd_d,
+                'oddA': odd_a,
+                'source': source
+            }
+
+
+def match_sort_key(m):
+    # by date if possible; undated matches last, in their original order
+    return (m['date_obj'] is None, m['date_obj'] or datetime.min)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild matches_full.json and the rating files from data/*.csv')
+    parser.add_argument('--glicko2', action='store_true',
+                        help='also run the Glicko-2 engine (weekly rating periods) and add '
+                             'glickoRating/glickoRd/glickoVolatility to ratings_home_away.json')
+    parser.add_argument('--sqlite', nargs='?', const=store.DB_FILE, metavar='PATH',
+                        help='maintain the SQLite store (default: data/elo.sqlite) and export the '
+                             'JSON files from it')
+    parser.add_argument('--no-change-feed', action='store_true',
+                        help='do not publish a new version to the change feed (data/changes/)')
+    parser.add_argument('--stream', action='store_true',
+                        help='bounded memory: sort through temporary files and write each rated match '
+                             'straight to matches_full.json (skips the stages that need every match '
+                             'in memory: Glicko-2, goal model, SQLite store, change feed and '
+                             'leaderboards)')
+    parser.add_argument('--max-rows', type=int, default=STREAM_MAX_ROWS,
+                        help=f'matches held in memory per sorted run with --stream (default: {STREAM_MAX_ROWS})')
+    parser.add_argument('--ndjson', action='store_true',
+                        help=f'with --stream, also write one match per line to {os.path.basename(OUT_MATCHES_NDJSON)}')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='parse every CSV instead of reusing data/cache/')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
     # load clubs
     with open(CLUBS_FILE, 'r', encoding='utf-8') as f:
         clubs = json.load(f)
@@ -131,66 +260,33 @@ def main():
         if nm and cid is not None:
             norm_to_id[normalize(nm)] = cid
             id_to_name[cid] = nm
+            for alias in c.get('aliases') or []:
+                norm_to_id.setdefault(normalize(alias), cid)
 
     # gather csv files
     csv_files = glob.glob(os.path.join(DATA_DIR, '*.csv'))
     csv_files = [p for p in csv_files if os.path.basename(p).lower() not in ('clubs.csv',)]
 
-    matches = []
     unmapped = set()
-    processed = 0
-    skipped = 0
-
-    for p in csv_files:
-        try:
-            with open(p, 'r', encoding='utf-8') as fh:
-                reader = csv.DictReader(fh)
-                for row in reader:
-                    date_s = row.get('Date') or row.get('date')
-                    home = row.get('HomeTeam') or row.get('Home') or row.get('home')
-                    away = row.get('AwayTeam') or row.get('Away') or row.get('away')
-                    fthg = row.get('FTHG') or row.get('HomeGoals') or row.get('FTHG')
-                    ftag = row.get('FTAG') or row.get('AwayGoals') or row.get('FTAG')
-
-                    if not home or not away:
-                        skipped += 1
-                        continue
-                    hid = norm_to_id.get(normalize(home))
-                    aid = norm_to_id.get(normalize(away))
-                    if not hid:
-                        unmapped.add(home)
-                    if not aid:
-                        unmapped.add(away)
-                    if not hid or not aid:
-                        skipped += 1
-                        continue
-
-                    try:
-                        hg = int(fthg) if fthg is not None and fthg != '' else 0
-                    except Exception:
-                        hg = 0
-                    try:
-                        ag = int(ftag) if ftag is not None and ftag != '' else 0
-                    except Exception:
-                        ag = 0
-
-                    dt = parse_date(date_s)
-                    matches.append({
-                        'date_raw': date_s,
-                        'date': dt.isoformat() if dt else None,
-                        'date_obj': dt,
-                        'home': hid,
-                        'away': aid,
-                        'homeGoals': hg,
-                        'awayGoals': ag,
-                        'source': os.path.basename(p)
-                    })
-                    processed += 1
-        except Exception as e:
-            print('Failed to read', p, e)
-
-    # sort matches by date if possible, otherwise keep original order
-    matches.sort(key=lambda m: (m['date_obj'] is None, m['date_obj'] or datetime.min))
+    counts = {'processed': 0, 'skipped': 0}
+    cache = corpus_cache.CorpusCache('ratings', version=[PARSE_VERSION, sorted(norm_to_id.items())],
+                                     enabled=not args.no_cache)
+    rows = read_matches(csv_files, norm_to_id, unmapped, counts, cache)
+
+    writers = []
+    if args.stream:
+        # external merge sort: at most --max-rows parsed matches in memory at a time
+        matches = None
+        ordered = streaming.external_sort(rows, match_sort_key, max_rows=args.max_rows)
+        writers.append(streaming.JsonArrayWriter(OUT_MATCHES))
+        if args.ndjson:
+            writers.append(streaming.NdjsonWriter(OUT_MATCHES_NDJSON))
+        extras_writer = match_extras.Writer(OUT_MATCH_EXTRAS)
+        index_builder = market_index.IndexBuilder()
+    else:
+        matches = list(rows)
+        matches.sort(key=match_sort_key)
+        ordered = matches
 
     # compute overall ELO (single rating) and also home/away ratings
     overall_elos = {c['id']: BASE_ELO for c in clubs}
@@ -201,8 +297,12 @@ def main():
     home_counts = defaultdict(int)
     away_counts = defaultdict(int)
 
+    # rolling home/away form and head-to-head records, filled as matches are rated
+    form = form_tables.FormTracker()
+
     last_date = None
-    for m in matches:
+    written = 0
+    for m in ordered:
         hid = m['home']
         aid = m['away']
         hg = m['homeGoals']
@@ -233,6 +333,26 @@ def main():
         m['awayEloPost'] = new_a_away
         m['homeDelta'] = hd2
         m['awayDelta'] = ad2
+        # overall rating after the match, for point-in-time queries (rating_history.py)
+        m['homeOverallPost'] = round(new_h, 2)
+        m['awayOverallPost'] = round(new_a, 2)
+        form.add(m)
+
+        if args.stream:
+            # rated match goes straight to disk, nothing is kept
+            written += 1
+            m['id'] = written
+            del m['date_obj']
+            base, extras = match_extras.split(m)
+            for w in writers:
+                w.write(base)
+            extras_writer.write(extras)
+            index_builder.add(m)
+
+    for w in writers:
+        w.close()
+    if args.stream:
+        extras_writer.close()
 
     # apply shrinkage blending home/away with overall to stabilize few-games teams
     ratings_ha = []
@@ -251,46 +371,117 @@ def main():
         overall = (final_h + final_a) / 2
         ratings_ha.append({'clubId': cid, 'homeElo': round(final_h, 2), 'awayElo': round(final_a, 2), 'overallElo': round(overall, 2), 'homeGames': hn, 'awayGames': an})
 
-    # assign match ids and drop date_obj
-    for i, m in enumerate(matches, start=1):
+    # optional Glicko-2 pass: rating deviation and volatility per club
+    glicko = None
+    if args.glicko2 and glicko2 is not None and not args.stream:
+        glicko = glicko2.rate(matches)
+        for r in ratings_ha:
+            if r['clubId'] in glicko:
+                rating, rd, vol = glicko[r['clubId']]
+                r['glickoRating'] = round(rating, 2)
+                r['glickoRd'] = round(rd, 2)
+                r['glickoVolatility'] = round(vol, 5)
+
+    # assign match ids and drop date_obj (already done match by match with --stream)
+    for i, m in enumerate(matches or (), start=1):
         m['id'] = i
         if 'date_obj' in m:
             del m['date_obj']
 
-    # write matches file
-    with open(OUT_MATCHES, 'w', encoding='utf-8') as f:
-        json.dump(matches, f, ensure_ascii=False, indent=2)
-
-    # write ratings home/away
-    with open(OUT_RATINGS_HA, 'w', encoding='utf-8') as f:
-        json.dump(ratings_ha, f, ensure_ascii=False, indent=2)
-
     # prepare overall ratings (use overall_elos final values)
+    rating_date = last_date or datetime.utcnow().date().isoformat()
     ratings_out = []
     for cid, val in overall_elos.items():
         ratings_out.append({
             'clubId': cid,
-            'date': last_date or datetime.utcnow().date().isoformat(),
+            'date': rating_date,
             'elo': round(val, 2)
         })
 
-    with open(OUT_RATINGS, 'w', encoding='utf-8') as f:
-        json.dump(ratings_out, f, ensure_ascii=False, indent=2)
+    # unmapped suggestions: difflib's closest normalized names and aliases,
+    # scored only for the keys the matcher's index shortlists
+    matcher = ClubMatcher(clubs)
+    suggestions = {name: matcher.close_keys(name, n=5, cutoff=SUGGEST_CUTOFF) for name in sorted(unmapped)}
+
+    if args.sqlite and not args.stream:
+        # upsert into the SQLite store and export the JSON files from it
+        conn = store.connect(args.sqlite)
+        store.upsert_clubs(conn, clubs)
+        store.upsert_matches(conn, matches)
+        store.upsert_snapshots(conn, ratings_ha, overall_elos, rating_date)
+        store.replace_unmapped(conn, suggestions)
+        store.export_matches(conn, OUT_MATCHES, OUT_MATCH_EXTRAS)
+        store.export_ratings(conn, OUT_RATINGS, OUT_RATINGS_HA)
+        store.export_unmapped(conn, OUT_UNMAPPED)
+        conn.close()
+    else:
+        # write matches file (odds and overall ratings go to the match_extras.json side file)
+        if not args.stream:
+            match_extras.write(matches, OUT_MATCHES, OUT_MATCH_EXTRAS)
+
+        # write ratings home/away
+        with open(OUT_RATINGS_HA, 'w', encoding='utf-8') as f:
+            json.dump(ratings_ha, f, ensure_ascii=False, indent=2)
+
+        with open(OUT_RATINGS, 'w', encoding='utf-8') as f:
+            json.dump(ratings_out, f, ensure_ascii=False, indent=2)
+
+        with open(OUT_UNMAPPED, 'w', encoding='utf-8') as f:
+            json.dump(suggestions, f, ensure_ascii=False, indent=2)
 
-    # unmapped suggestions using difflib
-    suggestions = {}
-    club_norms = list(norm_to_id.keys())
-    for name in sorted(unmapped):
-        nrm = normalize(name)
-        choices = difflib.get_close_matches(nrm, club_norms, n=5, cutoff=0.7)
-        suggestions[name] = choices
+    # versioned delta of new/changed matches and ratings for incremental clients
+    feed = None
+    if not args.no_change_feed and not args.stream:
+        feed = change_feed.publish([match_extras.split(m)[0] for m in matches], ratings_ha, ratings_out, OUT_CHANGES)
 
-    with open(OUT_UNMAPPED, 'w', encoding='utf-8') as f:
-        json.dump(suggestions, f, ensure_ascii=False, indent=2)
+    form.write(OUT_FORM, OUT_H2H)
 
-    print(f'Processed matches: {processed}, skipped (unmapped or invalid): {skipped}')
-    print(f'Wrote {len(matches)} matches to {OUT_MATCHES}')
+    # per-league/continent leaderboards with rating and rank movement
+    leaderboard_files = None
+    if not args.stream:
+        leaderboard_files = leaderboards.write_all(clubs, matches, ratings_out, OUT_LEADERBOARDS)
+
+    # implied-probability buckets of the B365 odds, per league
+    if args.stream:
+        market_index.save_index(index_builder.build(), OUT_MARKET_INDEX)
+    else:
+        market_index.write_index(matches, OUT_MARKET_INDEX)
+
+    # goal model (attack/defence/home advantage per league) next to the ratings
+    if goal_model is not None and not args.stream:
+        goal_model.GoalModel(goal_model.fit_all(matches)).save(OUT_GOAL_MODEL)
+
+    print(f"Processed matches: {counts['processed']}, skipped (unmapped or invalid): {counts['skipped']}")
+    print(cache.summary())
+    print(f'Wrote {written if args.stream else len(matches)} matches to {OUT_MATCHES} '
+          f'and their odds and overall ratings to {OUT_MATCH_EXTRAS}')
+    if args.ndjson and args.stream:
+        print(f'Wrote {written} matches to {OUT_MATCHES_NDJSON}')
     print(f'Wrote ratings for {len(ratings_ha)} clubs to {OUT_RATINGS_HA} and overall to {OUT_RATINGS}')
+    if args.sqlite and not args.stream:
+        print(f'Updated SQLite store {args.sqlite} and exported the JSON files from it')
+    if feed is not None:
+        print(f"Change feed at version {feed['version']} (base {feed['baseVersion']}, "
+              f"{len(feed['segments'])} delta segments) in {OUT_CHANGES}")
+    print(f'Wrote form windows to {OUT_FORM} and {len(form.pairs)} head-to-head records to {OUT_H2H}')
+    if leaderboard_files is not None:
+        print(f'Wrote {len(leaderboard_files)} leaderboard files to {OUT_LEADERBOARDS}')
+    print(f'Wrote market odds index to {OUT_MARKET_INDEX}')
+    if args.stream:
+        skipped_stages = ['goal model', 'change feed', 'leaderboards']
+        if args.glicko2:
+            skipped_stages.append('Glicko-2')
+        if args.sqlite:
+            skipped_stages.append('SQLite store')
+        print(f"--stream: skipped {', '.join(skipped_stages)} (they need every match in memory)")
+    elif goal_model is not None:
+        print(f'Wrote goal model parameters to {OUT_GOAL_MODEL}')
+    else:
+        print('numpy not installed, skipped goal model')
+    if glicko is not None:
+        print(f'Added Glicko-2 ratings for {len(glicko)} clubs to {OUT_RATINGS_HA}')
+    elif args.glicko2 and not args.stream:
+        print('numpy not installed, skipped Glicko-2')
     if suggestions:
         print(f'Wrote unmapped suggestions for {len(suggestions)} names to {OUT_UNMAPPED}')
 
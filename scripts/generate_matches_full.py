@@ -4,6 +4,7 @@ Script para gerar matches_full.json a partir de todos os CSVs de ligas
 Processa cada match calculando ELO ratings pré e pós-match
 """
 
+import argparse
 import os
 import json
 import csv
@@ -11,6 +12,8 @@ from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 
+from corpus_cache import CorpusCache
+
 # Configurações
 DATA_FOLDER = os.path.join(os.path.dirname(__file__), "..", "data")
 OUTPUT_FILE = os.path.join(DATA_FOLDER, "matches_full.json")
@@ -23,6 +26,9 @@ INITIAL_ELO = 1800
 HOME_ADVANTAGE = 100
 K_FACTOR = 400
 
+# Aumentar quando parse_csv_file mudar, para invalidar data/cache/matches_full
+PARSE_VERSION = 1
+
 def load_clubs():
     """Carrega o dicionário de clubes"""
     if not os.path.exists(CLUBS_FILE):
@@ -56,14 +62,21 @@ def get_club_info(name, clubs):
         return clubs[name_key]
     return None
 
-def process_csv_file(filepath, clubs, club_elos):
-    """Processa um arquivo CSV e retorna lista de matches"""
-    matches = []
-    
+def parse_csv_file(filepath, clubs):
+    """Lê um CSV e devolve as linhas válidas (sem ELO) e os avisos gerados.
+
+    Cada linha é (date_raw, date_iso, home_id, away_id, home_goals, away_goals);
+    date_iso é None quando a data não pôde ser lida (o jogo conta para o ELO
+    mas não é exportado). O resultado só depende do arquivo e de clubs.json,
+    por isso fica em cache (corpus_cache) entre execuções.
+    """
+    rows = []
+    warnings = []
+
     try:
         with open(filepath, 'r', encoding='utf-8') as f:
             reader = csv.DictReader(f)
-            
+
             for row in reader:
                 try:
                     # Extrair informações básicas
@@ -72,56 +85,29 @@ def process_csv_file(filepath, clubs, club_elos):
                     away_name = row.get('AwayTeam', '').strip()
                     home_goals = row.get('FTHG', '')
                     away_goals = row.get('FTAG', '')
-                    
+
                     # Validar dados
                     if not date_raw or not home_name or not away_name:
                         continue
                     if not home_goals or not away_goals:
                         continue
-                    
+
                     try:
                         home_goals = int(home_goals)
                         away_goals = int(away_goals)
                     except ValueError:
                         continue
-                    
+
                     # Encontrar IDs dos clubes
                     home_club = get_club_info(home_name, clubs)
                     away_club = get_club_info(away_name, clubs)
-                    
+
                     if not home_club or not away_club:
-                        print(f"  ⚠️ Clube não encontrado: {home_name} vs {away_name}")
+                        warnings.append(f"  ⚠️ Clube não encontrado: {home_name} vs {away_name}")
                         continue
-                    
-                    home_id = home_club['id']
-                    away_id = away_club['id']
-                    
-                    # Obter ELO pré-match
-                    home_elo_pre = club_elos[home_id]
-                    away_elo_pre = club_elos[away_id]
-                    
-                    # Calcular ELO pós-match
-                    exp_home = expected_score(home_elo_pre, away_elo_pre)
-                    
-                    if home_goals > away_goals:
-                        actual_home = 1.0
-                    elif home_goals == away_goals:
-                        actual_home = 0.5
-                    else:
-                        actual_home = 0.0
-                    
-                    home_elo_post = calculate_new_elo(home_elo_pre, exp_home, actual_home)
-                    away_elo_post = calculate_new_elo(away_elo_pre, 1 - exp_home, 1 - actual_home)
-                    
-                    # Calcular delta
-                    home_delta = home_elo_post - home_elo_pre
-                    away_delta = away_elo_post - away_elo_pre
-                    
-                    # Atualizar ELOs para próximo match
-                    club_elos[home_id] = home_elo_post
-                    club_elos[away_id] = away_elo_post
-                    
+
                     # Parsear data
+                    date_iso = None
                     try:
                         # Tentar diferentes formatos
                         date_obj = None
@@ -131,47 +117,93 @@ def process_csv_file(filepath, clubs, club_elos):
                                 break
                             except:
                                 continue
-                        
+
                         if not date_obj:
-                            print(f"  ⚠️ Data inválida: {date_raw}")
-                            continue
-                        
-                        date_iso = date_obj.isoformat()
+                            warnings.append(f"  ⚠️ Data inválida: {date_raw}")
+                        else:
+                            date_iso = date_obj.isoformat()
                     except:
-                        print(f"  ⚠️ Erro ao parsear data: {date_raw}")
-                        continue
-                    
-                    # Criar objeto de match
-                    match = {
-                        "date_raw": date_raw,
-                        "date": date_iso,
-                        "home": home_id,
-                        "away": away_id,
-                        "homeGoals": home_goals,
-                        "awayGoals": away_goals,
-                        "source": os.path.basename(filepath),
-                        "homeEloPre": home_elo_pre,
-                        "awayEloPre": away_elo_pre,
-                        "homeEloPost": round(home_elo_post, 1),
-                        "awayEloPost": round(away_elo_post, 1),
-                        "homeDelta": round(home_delta, 1),
-                        "awayDelta": round(away_delta, 1),
-                    }
-                    
-                    matches.append(match)
-                    
+                        warnings.append(f"  ⚠️ Erro ao parsear data: {date_raw}")
+
+                    rows.append((date_raw, date_iso, home_club['id'], away_club['id'], home_goals, away_goals))
+
                 except Exception as e:
                     continue
-        
-        return matches
-        
+
+        return {'rows': rows, 'warnings': warnings, 'error': None}
+
     except Exception as e:
-        print(f"Erro ao processar {filepath}: {e}")
+        return {'rows': rows, 'warnings': warnings, 'error': str(e)}
+
+def process_csv_file(filepath, clubs, club_elos, cache):
+    """Processa um arquivo CSV e retorna lista de matches"""
+    parsed = cache.load(filepath, lambda path: parse_csv_file(path, clubs))
+    for warning in parsed['warnings']:
+        print(warning)
+
+    matches = []
+    for date_raw, date_iso, home_id, away_id, home_goals, away_goals in parsed['rows']:
+        # Obter ELO pré-match
+        home_elo_pre = club_elos[home_id]
+        away_elo_pre = club_elos[away_id]
+
+        # Calcular ELO pós-match
+        exp_home = expected_score(home_elo_pre, away_elo_pre)
+
+        if home_goals > away_goals:
+            actual_home = 1.0
+        elif home_goals == away_goals:
+            actual_home = 0.5
+        else:
+            actual_home = 0.0
+
+        home_elo_post = calculate_new_elo(home_elo_pre, exp_home, actual_home)
+        away_elo_post = calculate_new_elo(away_elo_pre, 1 - exp_home, 1 - actual_home)
+
+        # Calcular delta
+        home_delta = home_elo_post - home_elo_pre
+        away_delta = away_elo_post - away_elo_pre
+
+        # Atualizar ELOs para próximo match
+        club_elos[home_id] = home_elo_post
+        club_elos[away_id] = away_elo_post
+
+        # Jogos sem data válida atualizam o ELO mas não são exportados
+        if date_iso is None:
+            continue
+
+        # Criar objeto de match
+        match = {
+            "date_raw": date_raw,
+            "date": date_iso,
+            "home": home_id,
+            "away": away_id,
+            "homeGoals": home_goals,
+            "awayGoals": away_goals,
+            "source": os.path.basename(filepath),
+            "homeEloPre": home_elo_pre,
+            "awayEloPre": away_elo_pre,
+            "homeEloPost": round(home_elo_post, 1),
+            "awayEloPost": round(away_elo_post, 1),
+            "homeDelta": round(home_delta, 1),
+            "awayDelta": round(away_delta, 1),
+        }
+
+        matches.append(match)
+
+    # Erro de leitura no meio do arquivo: o ELO das linhas já lidas conta, os jogos não
+    if parsed['error']:
+        print(f"Erro ao processar {filepath}: {parsed['error']}")
         return []
 
-def main():
+    return matches
+
+def main(argv=None):
     """Processa todos os CSVs e gera matches_full.json"""
-    
+    parser = argparse.ArgumentParser(description='Gera matches_full.json a partir dos CSVs')
+    parser.add_argument('--no-cache', action='store_true', help='ignora o cache em data/cache/')
+    args = parser.parse_args(argv)
+
     print(f"\n{'='*70}")
     print("Gerando matches_full.json")
     print(f"{'='*70}\n")
@@ -183,6 +215,10 @@ def main():
     
     # Inicializar ELOs de todos os clubes
     club_elos = defaultdict(lambda: INITIAL_ELO)
+
+    # Linhas já lidas ficam em cache por conteúdo do CSV + versão de clubs.json
+    cache = CorpusCache('matches_full', version=[PARSE_VERSION, sorted((k, c['id']) for k, c in clubs.items())],
+                        enabled=not args.no_cache)
     
     # Encontrar todos os CSVs
     csv_files = sorted([f for f in os.listdir(DATA_FOLDER) if f.endswith('.csv')])
@@ -199,12 +235,13 @@ def main():
         filepath = os.path.join(DATA_FOLDER, csv_file)
         print(f"⚽ Processando {csv_file}...")
         
-        matches = process_csv_file(filepath, clubs, club_elos)
+        matches = process_csv_file(filepath, clubs, club_elos, cache)
         all_matches.extend(matches)
         
         print(f"   ✓ {len(matches)} matches processados")
         total_processed += len(matches)
     
+    print(f"\n{cache.summary()}")
     print(f"\n{'='*70}")
     print(f"Total de matches: {len(all_matches)}")
     print(f"{'='*70}\n")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Glicko-2 rating engine with weekly rating periods, vectorized with NumPy.
+
+Matches are grouped into rating periods (ISO weeks, which is one matchday
+for most leagues) and every club that played in a period is updated at once
+from the ratings all clubs had when the period started. Clubs carry a rating
+deviation (RD) and a volatility, so each rating comes with a real
+uncertainty; clubs that sit out a period only see their RD grow, and so
+does every club for each week without any match (breaks, off-season).
+
+Periods are calendar weeks shared by all leagues, not kept per league: a
+club's RD grows with the weeks it does not play, whether its own league is
+on a break or not, and a week only counts as empty when no league played.
+
+The base rating and home advantage are the Elo engine's (elo.py): ratings
+start at BASE_ELO and the home club's rating is raised by HOME_ADV points
+when computing expected scores.
+
+Called by generate_matches_and_ratings.py --glicko2, which writes
+glickoRating/glickoRd/glickoVolatility into ratings_home_away.json.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+from elo import BASE_ELO, HOME_ADV
+
+BASE_RD = 350.0
+BASE_VOLATILITY = 0.06
+TAU = 0.5
+SCALE = 173.7178
+EPSILON = 1e-6
+MAX_ITER = 100
+
+
+def period_key(date_obj):
+    # consecutive number of the Monday-to-Sunday (ISO) week; day 1 is a Monday
+    return (date_obj.toordinal() - 1) // 7
+
+
+def g(phi):
+    return 1 / np.sqrt(1 + 3 * phi ** 2 / np.pi ** 2)
+
+
+def new_volatility(sigma, phi, v, delta, tau=TAU):
+    """Illinois iteration of Glicko-2 step 5, for arrays of clubs at once."""
+    a = np.log(sigma ** 2)
+    d2, p2 = delta ** 2, phi ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (d2 - p2 - v - ex) / (2 * (p2 + v + ex) ** 2) - (x - a) / tau ** 2
+
+    big = d2 > p2 + v
+    A = a.copy()
+    B = np.where(big, np.log(np.maximum(d2 - p2 - v, 1e-300)), a - tau)
+    # bracket: step B down until f(B) >= 0 for the clubs that need it
+    todo = ~big & (f(B) < 0)
+    for _ in range(MAX_ITER):
+        if not todo.any():
+            break
+        B = np.where(todo, B - tau, B)
+        todo = todo & (f(B) < 0)
+
+    fA, fB = f(A), f(B)
+    active = np.abs(B - A) > EPSILON
+    for _ in range(MAX_ITER):
+        if not active.any():
+            break
+        denom = np.where(active, fB - fA, 1.0)
+        C = A + (A - B) * fA / denom
+        fC = f(C)
+        swap = fC * fB <= 0
+        A = np.where(active & swap, B, A)
+        fA = np.where(active & swap, fB, np.where(active, fA / 2, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+        active = active & (np.abs(B - A) > EPSILON)
+    return np.exp(A / 2)
+
+
+def rate(matches):
+    """Run Glicko-2 over matches sorted by date.
+
+    `matches` are dicts with home, away, homeGoals, awayGoals and date_obj.
+    Returns {clubId: (rating, rd, volatility)}.
+    """
+    ids = sorted({m['home'] for m in matches} | {m['away'] for m in matches})
+    index = {cid: i for i, cid in enumerate(ids)}
+    n = len(ids)
+    mu = np.zeros(n)
+    phi = np.full(n, BASE_RD / SCALE)
+    sigma = np.full(n, BASE_VOLATILITY)
+    home_adv = HOME_ADV / SCALE
+    phi_max = BASE_RD / SCALE
+
+    periods = defaultdict(list)
+    for m in matches:
+        if m.get('date_obj') is None:
+            continue
+        periods[period_key(m['date_obj'])].append(m)
+
+    last = None
+    for week in sorted(periods):
+        rows = periods[week]
+        if last is not None and week - last > 1:
+            # empty weeks since the previous period: RD grows once per week for every club
+            phi = np.minimum(np.sqrt(phi ** 2 + (week - last - 1) * sigma ** 2), phi_max)
+        last = week
+
+        h = np.fromiter((index[m['home']] for m in rows), np.int64, len(rows))
+        a = np.fromiter((index[m['away']] for m in rows), np.int64, len(rows))
+        s_home = np.fromiter((1.0 if m['homeGoals'] > m['awayGoals'] else 0.5 if m['homeGoals'] == m['awayGoals'] else 0.0
+                              for m in rows), np.float64, len(rows))
+
+        # expected scores from the ratings at the start of the period
+        g_a, g_h = g(phi[a]), g(phi[h])
+        e_home = 1 / (1 + np.exp(-g_a * (mu[h] + home_adv - mu[a])))
+        e_away = 1 / (1 + np.exp(-g_h * (mu[a] - mu[h] - home_adv)))
+
+        v_inv = (np.bincount(h, g_a ** 2 * e_home * (1 - e_home), n)
+                 + np.bincount(a, g_h ** 2 * e_away * (1 - e_away), n))
+        score = (np.bincount(h, g_a * (s_home - e_home), n)
+                 + np.bincount(a, g_h * ((1 - s_home) - e_away), n))
+
+        played = v_inv > 0
+        v = 1 / v_inv[played]
+        delta = v * score[played]
+        sig = new_volatility(sigma[played], phi[played], v, delta)
+
+        phi_star = np.sqrt(phi[played] ** 2 + sig ** 2)
+        phi_new = 1 / np.sqrt(1 / phi_star ** 2 + 1 / v)
+        mu[played] += phi_new ** 2 * score[played]
+        sigma[played] = sig
+        rested = ~played
+        phi[rested] = np.minimum(np.sqrt(phi[rested] ** 2 + sigma[rested] ** 2), phi_max)
+        phi[played] = phi_new
+
+    return {cid: (float(BASE_ELO + SCALE * mu[i]), float(SCALE * phi[i]), float(sigma[i]))
+            for cid, i in index.items()}
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Poisson / Dixon-Coles goal model fitted per league from the match history.
+
+For every league (the CSV prefix of `source`, e.g. E0) each club gets an
+attack and a defence strength and the league gets a home advantage:
+
+    home goals ~ Poisson(home * attack[h] * defence[a])
+    away goals ~ Poisson(attack[a] * defence[h])
+
+with Dixon-Coles' rho correcting the 0-0/1-0/0-1/1-1 cells. Older matches
+can be down-weighted with an exponential decay (half-life in days). The fit
+is the classic iterative proportional update of the Poisson likelihood and
+every step is a handful of NumPy bincounts over the whole league.
+
+The generator writes the parameters to data/goal_model.json; GoalModel turns
+any batch of pairings into score matrices in one vectorized call:
+
+    model = GoalModel.load()
+    grids = model.score_matrix('E0', [511, 10], [510, 12])   # shape (2, 11, 11)
+    home, draw, away = outcome_probs(grids)
+"""
+import json
+import os
+from collections import defaultdict
+
+import numpy as np
+
+from leagues import league_code
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+MODEL_FILE = os.path.join(DATA_DIR, 'goal_model.json')
+
+HALF_LIFE_DAYS = 365
+MAX_GOALS = 10
+ITERATIONS = 60
+RHO_GRID = np.linspace(-0.2, 0.2, 81)
+MIN_RATE = 1e-6  # floor of the expected goals before taking their log
+
+
+def decay_weights(dates, half_life_days):
+    """Weights halving every `half_life_days` before the most recent date."""
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    if not half_life_days:
+        return np.ones(len(days))
+    age = days.max() - days
+    return np.power(0.5, age / half_life_days)
+
+
+def dc_tau(hg, ag, lam, mu, rho):
+    """Dixon-Coles low-score correction for arrays of scores and means."""
+    tau = np.ones(np.broadcast(hg, lam, rho).shape)
+    tau = np.where((hg == 0) & (ag == 0), 1 - lam * mu * rho, tau)
+    tau = np.where((hg == 0) & (ag == 1), 1 + lam * rho, tau)
+    tau = np.where((hg == 1) & (ag == 0), 1 + mu * rho, tau)
+    tau = np.where((hg == 1) & (ag == 1), 1 - rho, tau)
+    return tau
+
+
+def fit_league(home, away, hg, ag, weights, iterations=ITERATIONS):
+    """Fit one league. home/away are dense club indexes (0..n-1).
+
+    Returns (attack, defence, home_advantage, rho) as NumPy values.
+    """
+    n = int(max(home.max(), away.max())) + 1
+    w_hg, w_ag = weights * hg, weights * ag
+    scored = np.bincount(home, w_hg, n) + np.bincount(away, w_ag, n)
+    conceded = np.bincount(away, w_hg, n) + np.bincount(home, w_ag, n)
+    total_home_goals = w_hg.sum()
+
+    attack = np.ones(n)
+    defence = np.ones(n)
+    home_adv = max(total_home_goals / max(w_ag.sum(), 1e-9), 1e-3)
+    for _ in range(iterations):
+        exp_att = (np.bincount(home, weights * home_adv * defence[away], n)
+                   + np.bincount(away, weights * defence[home], n))
+        attack = scored / np.maximum(exp_att, 1e-9)
+        attack /= attack[attack > 0].mean()
+        exp_def = (np.bincount(away, weights * home_adv * attack[home], n)
+                   + np.bincount(home, weights * attack[away], n))
+        defence = conceded / np.maximum(exp_def, 1e-9)
+        home_adv = total_home_goals / max((weights * attack[home] * defence[away]).sum(), 1e-9)
+
+    # rho by grid search: only the four low-score cells depend on it
+    lam = home_adv * attack[home] * defence[away]
+    mu = attack[away] * defence[home]
+    low = (hg <= 1) & (ag <= 1)
+    tau = dc_tau(hg[low, None], ag[low, None], lam[low, None], mu[low, None], RHO_GRID[None, :])
+    loglik = (weights[low, None] * np.log(np.maximum(tau, 1e-12))).sum(axis=0)
+    rho = float(RHO_GRID[int(np.argmax(loglik))])
+    return attack, defence, float(home_adv), rho
+
+
+def fit_all(matches, half_life_days=HALF_LIFE_DAYS):
+    """Fit every league present in `matches` (dicts as in matches_full.json)."""
+    by_league = defaultdict(list)
+    for m in matches:
+        if m.get('date'):
+            by_league[league_code(m.get('source'))].append(m)
+
+    leagues = {}
+    for code, rows in sorted(by_league.items()):
+        club_ids = sorted({m['home'] for m in rows} | {m['away'] for m in rows})
+        index = {cid: i for i, cid in enumerate(club_ids)}
+        home = np.fromiter((index[m['home']] for m in rows), np.int64, len(rows))
+        away = np.fromiter((index[m['away']] for m in rows), np.int64, len(rows))
+        hg = np.fromiter((m['homeGoals'] for m in rows), np.float64, len(rows))
+        ag = np.fromiter((m['awayGoals'] for m in rows), np.float64, len(rows))
+        dates = np.array([m['date'][:10] for m in rows], dtype='datetime64[D]')
+        weights = decay_weights(dates, half_life_days)
+
+        attack, defence, home_adv, rho = fit_league(home, away, hg, ag, weights)
+        leagues[code] = {
+            'home': round(home_adv, 5),
+            'rho': round(rho, 5),
+            'matches': len(rows),
+            'lastDate': str(dates.max()),
+            'clubs': {str(cid): [round(float(attack[i]), 5), round(float(defence[i]), 5)]
+                      for cid, i in index.items()},
+        }
+    return {'halfLifeDays': half_life_days, 'leagues': leagues}
+
+
+def outcome_probs(grids):
+    """(home win, draw, away win) arrays from a batch of score matrices."""
+    home = np.tril(grids, -1).sum(axis=(-2, -1))
+    draw = np.trace(grids, axis1=-2, axis2=-1)
+    away = np.triu(grids, 1).sum(axis=(-2, -1))
+    return home, draw, away
+
+
+class GoalModel:
+    """Fitted parameters of every league, as dense arrays per league."""
+
+    def __init__(self, params):
+        self.params = params
+        self.leagues = {}
+        for code, lg in params.get('leagues', {}).items():
+            ids = [int(cid) for cid in lg['clubs']]
+            values = np.array(list(lg['clubs'].values()), dtype=np.float64).reshape(-1, 2)
+            self.leagues[code] = {
+                'index': {cid: i for i, cid in enumerate(ids)},
+                'attack': values[:, 0],
+                'defence': values[:, 1],
+                'home': lg['home'],
+                'rho': lg['rho'],
+            }
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def save(self, path=MODEL_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.params, f, ensure_ascii=False)
+
+    def expected_goals(self, code, home_ids, away_ids):
+        """Expected goals of each pairing; clubs the league has not seen count as average."""
+        lg = self.leagues[code]
+        idx = lg['index']
+        # unseen clubs point at an extra "average" slot (strength 1.0)
+        pad = len(lg['attack'])
+        attack = np.append(lg['attack'], 1.0)
+        defence = np.append(lg['defence'], 1.0)
+        h = np.array([idx.get(c, pad) for c in home_ids], dtype=np.int64)
+        a = np.array([idx.get(c, pad) for c in away_ids], dtype=np.int64)
+        lam = lg['home'] * attack[h] * defence[a]
+        mu = attack[a] * defence[h]
+        return lam, mu
+
+    def score_matrix(self, code, home_ids, away_ids, max_goals=MAX_GOALS):
+        """Score probabilities, shape (n, max_goals + 1, max_goals + 1), [i, home, away]."""
+        lam, mu = self.expected_goals(code, home_ids, away_ids)
+        # a club that never scored (or never conceded) has a strength of 0
+        lam, mu = np.maximum(lam, MIN_RATE), np.maximum(mu, MIN_RATE)
+        goals = np.arange(max_goals + 1)
+        log_fact = np.concatenate(([0.0], np.cumsum(np.log(goals[1:]))))
+        p_home = np.exp(goals * np.log(lam)[:, None] - lam[:, None] - log_fact)
+        p_away = np.exp(goals * np.log(mu)[:, None] - mu[:, None] - log_fact)
+        grids = p_home[:, :, None] * p_away[:, None, :]
+
+        rho = self.leagues[code]['rho']
+        grids[:, 0, 0] *= 1 - lam * mu * rho
+        grids[:, 0, 1] *= 1 + lam * rho
+        grids[:, 1, 0] *= 1 + mu * rho
+        grids[:, 1, 1] *= 1 - rho
+        grids /= grids.sum(axis=(1, 2), keepdims=True)
+        return grids
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Ready-to-render Elo leaderboards and current-season league tables.
+
+Builds, from the rated matches, one small file per league (clubs.json
+league name), per continent and for all clubs, under data/leaderboards/:
+
+    index.json                     {date, leagues: [...], continents: [...]}
+    all.json, league_<slug>.json, continent_<slug>.json
+        {name, date, periods, rows: [...], standings: [...] | null}
+
+Each row carries the club's current Elo rank in the group, its rating
+change over the last 7 and 30 days and since the season start, and the
+rank it moved by over the same periods (positive = climbed). Past ratings
+come from rating_history.RatingHistory, so no replay is needed. League
+files of the leagues we have CSVs for also carry the current season's
+standings (3/1/0 points) computed from the results, which ranking.html
+shows below the ranking when a league is selected.
+
+The generator writes them on every run; to rebuild from the JSON files:
+
+    python scripts/leaderboards.py
+"""
+import argparse
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import date, timedelta
+
+from leagues import LEAGUE_CODES, source_parts
+import match_extras
+from rating_history import RatingHistory
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CLUBS_FILE = os.path.join(DATA_DIR, 'clubs.json')
+MATCHES_FILE = os.path.join(DATA_DIR, 'matches_full.json')
+RATINGS_FILE = os.path.join(DATA_DIR, 'ratings.json')
+OUT_DIR = os.path.join(DATA_DIR, 'leaderboards')
+
+PERIODS = (('7d', 7), ('30d', 30))
+
+
+def slugify(name):
+    ascii_name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-') or 'unknown'
+
+
+def current_seasons(matches):
+    """Latest season of every league code, and the date its first match was played."""
+    latest = {}
+    for m in matches:
+        code, season = source_parts(m.get('source'))
+        if season and season > latest.get(code, ''):
+            latest[code] = season
+    starts = {}
+    for m in matches:
+        code, season = source_parts(m.get('source'))
+        if m.get('date') and latest.get(code) == season:
+            d = m['date'][:10]
+            if d < starts.get(code, '9999'):
+                starts[code] = d
+    return latest, starts
+
+
+def standings(matches, code, season, clubs_by_id):
+    table = defaultdict(lambda: {'played': 0, 'won': 0, 'drawn': 0, 'lost': 0,
+                                 'goalsFor': 0, 'goalsAgainst': 0, 'points': 0})
+    for m in matches:
+        if source_parts(m.get('source')) != (code, season):
+            continue
+        for cid, gf, ga in ((m['home'], m['homeGoals'], m['awayGoals']),
+                            (m['away'], m['awayGoals'], m['homeGoals'])):
+            row = table[cid]
+            row['played'] += 1
+            row['goalsFor'] += gf
+            row['goalsAgainst'] += ga
+            if gf > ga:
+                row['won'] += 1
+                row['points'] += 3
+            elif gf == ga:
+                row['drawn'] += 1
+                row['points'] += 1
+            else:
+                row['lost'] += 1
+    rows = []
+    for cid, row in table.items():
+        row['goalDifference'] = row['goalsFor'] - row['goalsAgainst']
+        rows.append(dict(clubId=cid, name=clubs_by_id.get(cid, {}).get('name', str(cid)), **row))
+    rows.sort(key=lambda r: (-r['points'], -r['goalDifference'], -r['goalsFor'], r['name']))
+    for pos, row in enumerate(rows, start=1):
+        row['position'] = pos
+    return rows
+
+
+def ranks(club_ids, ratings, clubs_by_id):
+    ordered = sorted(club_ids, key=lambda cid: (-ratings[cid], clubs_by_id[cid]['name']))
+    return {cid: pos for pos, cid in enumerate(ordered, start=1)}
+
+
+def leaderboard(club_ids, current, past, clubs_by_id):
+    """Rows for one group; `past` maps period name -> {clubId: rating}."""
+    now_rank = ranks(club_ids, current, clubs_by_id)
+    past_rank = {p: ranks(club_ids, ratings, clubs_by_id) for p, ratings in past.items()}
+    rows = []
+    for cid in sorted(club_ids, key=now_rank.get):
+        club = clubs_by_id[cid]
+        row = {'rank': now_rank[cid], 'clubId': cid, 'name': club['name'],
+               'league': club.get('league'), 'continent': club.get('continent'),
+               'elo': round(current[cid], 2)}
+        for p, ratings in past.items():
+            row[f'change{p}'] = round(current[cid] - ratings[cid], 2)
+            row[f'rankChange{p}'] = past_rank[p][cid] - now_rank[cid]
+        rows.append(row)
+    return rows
+
+
+def build(clubs, matches, ratings):
+    """All leaderboard files as {file name: content}."""
+    clubs_by_id = {c['id']: c for c in clubs if c.get('id') is not None}
+    current = dict.fromkeys(clubs_by_id)
+    for r in ratings:
+        if r['clubId'] in clubs_by_id:
+            current[r['clubId']] = r['elo']
+    history = RatingHistory(matches)
+    dated = [m['date'][:10] for m in matches if m.get('date')]
+    ref = max(dated) if dated else date.today().isoformat()
+    for cid in current:
+        if current[cid] is None:
+            current[cid] = history.rating_at(cid, ref, inclusive=True)
+
+    ref_day = date.fromisoformat(ref)
+    period_dates = {name: (ref_day - timedelta(days=days)).isoformat() for name, days in PERIODS}
+    snapshots = {name: {cid: history.rating_at(cid, d, inclusive=True) for cid in current}
+                 for name, d in period_dates.items()}
+
+    latest, starts = current_seasons(matches)
+    # league-less groups use the earliest current-season start
+    default_start = min(starts.values()) if starts else ref
+    season_cache = {}
+
+    def season_snapshot(start):
+        if start not in season_cache:
+            season_cache[start] = {cid: history.rating_at(cid, start) for cid in current}
+        return season_cache[start]
+
+    def group_file(name, kind, club_ids, code=None):
+        start = starts.get(code, default_start)
+        past = dict(snapshots, Season=season_snapshot(start))
+        periods = dict(period_dates, Season=start)
+        return {
+            'name': name,
+            'kind': kind,
+            'date': ref,
+            'periods': periods,
+            'season': latest.get(code),
+            'rows': leaderboard(club_ids, current, past, clubs_by_id),
+            'standings': standings(matches, code, latest[code], clubs_by_id) if code in latest else None,
+        }
+
+    files = {'all.json': group_file('All clubs', 'all', list(current))}
+    index = {'date': ref, 'leagues': [], 'continents': []}
+
+    by_league, by_continent = defaultdict(list), defaultdict(list)
+    for cid, club in clubs_by_id.items():
+        by_league[club.get('league') or ''].append(cid)
+        by_continent[club.get('continent') or ''].append(cid)
+
+    for name, ids in sorted(by_league.items()):
+        if not name:
+            continue
+        fname = f'league_{slugify(name)}.json'
+        code = LEAGUE_CODES.get(name.lower())
+        files[fname] = group_file(name, 'league', ids, code)
+        index['leagues'].append({'name': name, 'file': fname, 'clubs': len(ids), 'code': code})
+    for name, ids in sorted(by_continent.items()):
+        if not name:
+            continue
+        fname = f'continent_{slugify(name)}.json'
+        files[fname] = group_file(name, 'continent', ids)
+        index['continents'].append({'name': name, 'file': fname, 'clubs': len(ids)})
+    files['index.json'] = index
+    return files
+
+
+def write_all(clubs, matches, ratings, out_dir=OUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    files = build(clubs, matches, ratings)
+    for fname, content in files.items():
+        with open(os.path.join(out_dir, fname), 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, separators=(',', ':'))
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild data/leaderboards/ from the rating files')
+    parser.add_argument('--out', default=OUT_DIR, help='output directory (default: data/leaderboards)')
+    args = parser.parse_args(argv)
+
+    with open(CLUBS_FILE, 'r', encoding='utf-8') as f:
+        clubs = json.load(f)
+    with open(MATCHES_FILE, 'r', encoding='utf-8') as f:
+        matches = match_extras.attach(json.load(f))
+    with open(RATINGS_FILE, 'r', encoding='utf-8') as f:
+        ratings = json.load(f)
+    files = write_all(clubs, matches, ratings, args.out)
+    print(f'Wrote {len(files)} leaderboard files to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+League codes of the football-data.co.uk files, shared by the scripts.
+
+    source_parts('E0_2526.csv')      # ('E0', '2526')
+    league_code('E0_2526.csv')       # 'E0'
+    LEAGUE_CODES['premier league']   # 'E0' (clubs.json league name, lower case)
+"""
+import os
+
+# js/fixtures_round.js mapLeagueNameToCode
+LEAGUE_CODES = {
+    'premier league': 'E0',
+    'championship': 'E1',
+    'league one': 'E2',
+    'league two': 'E3',
+    'la liga': 'SP1',
+    'la liga 2': 'SP2',
+    'ligue 1': 'F1',
+    'ligue 2': 'F2',
+    'serie a': 'I1',
+    'serie b': 'I2',
+    'bundesliga': 'D1',
+    'bundesliga 2': 'D2',
+    'jupiler league': 'B1',
+    'eredivisie': 'N1',
+    'primeira liga': 'P1',
+    'scottish premiership': 'SC0',
+    'super league': 'G1',
+    'futbol ligi 1': 'T1',
+}
+
+
+def source_parts(source):
+    """'E0_2526.csv' -> ('E0', '2526')."""
+    stem = os.path.splitext(os.path.basename(source or ''))[0]
+    code, _, season = stem.partition('_')
+    return code.upper(), season
+
+
+def league_code(source):
+    """'E0_2526.csv' -> 'E0' ('' without a source)."""
+    return source_parts(source)[0]
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Load test for fixture_proxy.py against a local stand-in for football-data.co.uk.
+
+Starts, in this process:
+
+  - a stand-in upstream serving a generated fixtures.csv, with configurable
+    latency, jitter, error rate and payload size, that counts its requests;
+  - the proxy itself (fixture_proxy.create_server, the same server the proxy
+    runs) with REMOTE_URL pointed at the stand-in and FETCH_SCRIPT replaced by
+    a no-op script that only records that it was started;
+
+then drives /fixtures, /health and /update-leagues from `--concurrency`
+threads and prints one JSON report: throughput, p50/p95/p99 latency and
+error rate per endpoint and overall, plus upstream request counts and fetch
+scripts started. Nothing leaves localhost and nothing in data/ is touched.
+
+    python scripts/loadtest_proxy.py
+    python scripts/loadtest_proxy.py --concurrency 50 --duration 30 --latency 0.5 --error-rate 0.1
+    python scripts/loadtest_proxy.py --mix fixtures=1 --rows 2000 --out /tmp/before.json
+"""
+import argparse
+import http.client
+import http.server
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+
+import fixture_proxy
+
+ENDPOINTS = {'fixtures': '/fixtures', 'health': '/health', 'update-leagues': '/update-leagues'}
+DEFAULT_MIX = 'fixtures=0.8,health=0.15,update-leagues=0.05'
+
+FIXTURE_HEADER = ['Div', 'Date', 'Time', 'HomeTeam', 'AwayTeam', 'B365H', 'B365D', 'B365A']
+NOOP_FETCH = "import sys\nwith open(sys.argv[0] + '.runs', 'a') as f:\n    f.write('run\\n')\n"
+
+
+def fixtures_csv(rows, seed=0):
+    """A fixtures.csv-shaped payload with `rows` fixtures."""
+    rng = random.Random(seed)
+    lines = [','.join(FIXTURE_HEADER)]
+    for i in range(rows):
+        odds = [round(rng.uniform(1.2, 9.0), 2) for _ in range(3)]
+        lines.append(','.join(['E0', '24/01/2026', '15:00', f'Home {i}', f'Away {i}'] + [str(o) for o in odds]))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class Upstream:
+    """Stand-in for the fixtures feed on a ThreadingHTTPServer."""
+
+    def __init__(self, payload, latency=0.0, jitter=0.0, error_rate=0.0, seed=0):
+        self.payload = payload
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        upstream = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                with upstream.lock:
+                    upstream.counts['requests'] += 1
+                    fail = upstream.rng.random() < upstream.error_rate
+                    delay = max(0.0, upstream.latency + upstream.rng.uniform(-upstream.jitter, upstream.jitter))
+                time.sleep(delay)
+                if fail:
+                    with upstream.lock:
+                        upstream.counts['errors'] += 1
+                    self.send_response(503)
+                    self.end_headers()
+                    self.wfile.write(b'Service Unavailable')
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/csv')
+                self.send_header('Content-Length', str(len(upstream.payload)))
+                self.end_headers()
+                self.wfile.write(upstream.payload)
+                with upstream.lock:
+                    upstream.counts['bytes'] += len(upstream.payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/fixtures.csv'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def count_runs(script):
+    try:
+        with open(script + '.runs', 'r', encoding='utf-8') as f:
+            return sum(1 for _ in f)
+    except OSError:
+        return 0
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f'unknown endpoint in --mix: {name} (choose from {", ".join(ENDPOINTS)})')
+        mix[name] = float(weight or 1)
+    if not any(w > 0 for w in mix.values()):
+        raise SystemExit('--mix needs at least one positive weight')
+    return mix
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    k = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[k]
+
+
+def request(host, port, path, timeout):
+    """(status or None, response bytes, error or None) of one GET."""
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        body = resp.read()
+        return resp.status, len(body), None
+    except Exception as e:
+        return None, 0, type(e).__name__
+    finally:
+        conn.close()
+
+
+def drive(host, port, mix, concurrency, total, duration, timeout, seed):
+    """Run the workers; returns (samples, wall time). A sample is (endpoint, status, seconds, bytes, error)."""
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = []
+    lock = threading.Lock()
+    issued = [0]
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        local = []
+        while True:
+            if deadline is not None:
+                if time.perf_counter() >= deadline:
+                    break
+            else:
+                with lock:
+                    if issued[0] >= total:
+                        break
+                    issued[0] += 1
+            name = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            status, size, error = request(host, port, ENDPOINTS[name], timeout)
+            local.append((name, status, time.perf_counter() - t0, size, error))
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, wall):
+    def stats(rows):
+        latencies = sorted(r[2] * 1000 for r in rows)
+        errors = [r for r in rows if r[4] is not None or r[1] >= 400]
+        statuses = Counter(str(r[1]) if r[1] is not None else r[4] for r in rows)
+        return {
+            'requests': len(rows),
+            'throughput': round(len(rows) / wall, 2) if wall else None,
+            'errors': len(errors),
+            'errorRate': round(len(errors) / len(rows), 4) if rows else None,
+            'statuses': dict(sorted(statuses.items())),
+            'bytes': sum(r[3] for r in rows),
+            'latencyMs': {
+                'mean': round(sum(latencies) / len(latencies), 2) if latencies else None,
+                'p50': round(percentile(latencies, 50), 2) if latencies else None,
+                'p95': round(percentile(latencies, 95), 2) if latencies else None,
+                'p99': round(percentile(latencies, 99), 2) if latencies else None,
+                'max': round(latencies[-1], 2) if latencies else None,
+            },
+        }
+
+    by_endpoint = defaultdict(list)
+    for r in samples:
+        by_endpoint[r[0]].append(r)
+    return stats(samples), {name: stats(rows) for name, rows in sorted(by_endpoint.items())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test fixture_proxy.py against a local stand-in upstream')
+    parser.add_argument('--concurrency', type=int, default=10, help='client threads (default: 10)')
+    parser.add_argument('--requests', type=int, default=500, help='total requests (default: 500)')
+    parser.add_argument('--duration', type=float, help='run for this many seconds instead of --requests')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'endpoint weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--latency', type=float, default=0.05, help='upstream latency in seconds (default: 0.05)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='upstream latency +/- this many seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of upstream requests answered 503')
+    parser.add_argument('--rows', type=int, default=400, help='fixtures in the upstream payload (default: 400)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='client timeout in seconds (default: 30)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--proxy-log', action='store_true', help="keep the proxy's per-request stderr log")
+    parser.add_argument('--out', help='also write the report to this file')
+    args = parser.parse_args(argv)
+    mix = parse_mix(args.mix)
+
+    payload = fixtures_csv(args.rows, args.seed)
+    upstream = Upstream(payload, args.latency, args.jitter, args.error_rate, args.seed)
+    upstream.start()
+
+    tmp_dir = tempfile.mkdtemp(prefix='loadtest_proxy_')
+    noop = os.path.join(tmp_dir, 'fetch_noop.py')
+    with open(noop, 'w', encoding='utf-8') as f:
+        f.write(NOOP_FETCH)
+    fixture_proxy.REMOTE_URL = upstream.url
+    fixture_proxy.FETCH_SCRIPT = noop
+    if not args.proxy_log:
+        fixture_proxy.ProxyHandler.log_message = lambda self, format, *a: None
+
+    proxy = fixture_proxy.create_server('127.0.0.1', 0)
+    host, port = proxy.server_address[:2]
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+
+    try:
+        samples, wall = drive(host, port, mix, args.concurrency, args.requests, args.duration,
+                              args.timeout, args.seed)
+    finally:
+        proxy.shutdown()
+        proxy.server_close()
+        upstream.stop()
+
+    # fetch scripts run in the background; give the last ones a moment to record themselves
+    expected = sum(1 for r in samples if r[0] == 'update-leagues' and r[1] == 200)
+    fetch_runs = count_runs(noop)
+    for _ in range(50):
+        if fetch_runs >= expected:
+            break
+        time.sleep(0.1)
+        fetch_runs = count_runs(noop)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    overall, endpoints = summarize(samples, wall)
+    fixtures_served = endpoints.get('fixtures', {}).get('requests', 0)
+    report = {
+        'config': {
+            'concurrency': args.concurrency,
+            'requests': None if args.duration else args.requests,
+            'duration': args.duration,
+            'mix': mix,
+            'upstreamLatency': args.latency,
+            'upstreamJitter': args.jitter,
+            'upstreamErrorRate': args.error_rate,
+            'payloadRows': args.rows,
+            'payloadBytes': len(payload),
+            'seed': args.seed,
+            'server': type(proxy).__name__,
+        },
+        'wallSeconds': round(wall, 3),
+        'overall': overall,
+        'endpoints': endpoints,
+        'upstream': {
+            'requests': upstream.counts['requests'],
+            'errors': upstream.counts['errors'],
+            'bytes': upstream.counts['bytes'],
+            'perFixturesRequest': round(upstream.counts['requests'] / fixtures_served, 3) if fixtures_served else None,
+        },
+        'fetchScriptsStarted': fetch_runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
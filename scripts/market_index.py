@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Per-league index of historical matches by market-implied probabilities.
+
+Every match with B365H/B365A closing odds falls into a cell of a grid keyed
+by the implied home probability (1/B365H) and away probability (1/B365A),
+in BUCKET steps. Each cell keeps the outcome counts and goal totals (and
+squared totals, for the standard deviations), and a
+summed-area table over the grid answers "all matches priced like this one"
+(a probability window around the fixture's odds) with four lookups,
+whatever the size of the history.
+
+The generator writes data/market_index.json; generate_fixtures.py reads it
+with MarketIndex for the market-odds analysis of every fixture:
+
+    index = MarketIndex.load()
+    index.query('E0', odd_h=2.10, odd_a=3.40, prob_range=0.05)
+"""
+import json
+import math
+import os
+
+from leagues import league_code
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+INDEX_FILE = os.path.join(DATA_DIR, 'market_index.json')
+
+BUCKET = 0.01
+SIZE = int(round(1 / BUCKET)) + 1
+# per-cell statistics, in this order
+FIELDS = ('matches', 'home', 'draw', 'away', 'homeGoals', 'awayGoals', 'homeGoals2', 'awayGoals2')
+
+
+def bucket(prob):
+    return min(SIZE - 1, max(0, int(prob / BUCKET)))
+
+
+def edges(lo, hi):
+    """First and last bucket of the window lo..hi, its ends snapped to the nearest bucket edge."""
+    first = min(SIZE - 1, max(0, int(round(lo / BUCKET))))
+    last = min(SIZE - 1, int(round(hi / BUCKET)) - 1)
+    return first, max(first, last)
+
+
+class IndexBuilder:
+    """Accumulates the sparse cells one match at a time (used by the streaming generator)."""
+
+    def __init__(self):
+        self.leagues = {}
+
+    def add(self, m):
+        odd_h, odd_a = m.get('oddH'), m.get('oddA')
+        if not odd_h or not odd_a:
+            return
+        cells = self.leagues.setdefault(league_code(m.get('source')), {})
+        key = (bucket(1 / odd_h), bucket(1 / odd_a))
+        cell = cells.setdefault(key, [0] * len(FIELDS))
+        hg, ag = m['homeGoals'], m['awayGoals']
+        cell[0] += 1
+        cell[1 if hg > ag else 2 if hg == ag else 3] += 1
+        cell[4] += hg
+        cell[5] += ag
+        cell[6] += hg * hg
+        cell[7] += ag * ag
+
+    def build(self):
+        return {
+            'bucket': BUCKET,
+            'fields': list(FIELDS),
+            'leagues': {code: [[ph, pa] + cell for (ph, pa), cell in sorted(cells.items())]
+                        for code, cells in sorted(self.leagues.items())},
+        }
+
+
+def build_index(matches):
+    """Sparse cells per league from matches carrying oddH/oddA."""
+    builder = IndexBuilder()
+    for m in matches:
+        builder.add(m)
+    return builder.build()
+
+
+def save_index(index, path=INDEX_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+
+def write_index(matches, path=INDEX_FILE):
+    index = build_index(matches)
+    save_index(index, path)
+    return index
+
+
+class MarketIndex:
+    """Summed-area tables (one per statistic) for every league of the index."""
+
+    def __init__(self, index):
+        self.tables = {}
+        n = len(FIELDS)
+        for code, cells in index.get('leagues', {}).items():
+            # table[f][i][j] = sum of field f over buckets < i (home) and < j (away)
+            grid = [[[0] * (SIZE + 1) for _ in range(SIZE + 1)] for _ in range(n)]
+            for ph, pa, *stats in cells:
+                for f in range(n):
+                    grid[f][ph + 1][pa + 1] += stats[f]
+            for f in range(n):
+                g = grid[f]
+                for i in range(1, SIZE + 1):
+                    row, prev = g[i], g[i - 1]
+                    acc = 0
+                    for j in range(1, SIZE + 1):
+                        acc += row[j]
+                        row[j] = acc + prev[j]
+            self.tables[code] = grid
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def window(self, code, h_lo, h_hi, a_lo, a_hi):
+        """Statistic totals over buckets h_lo..h_hi x a_lo..a_hi (inclusive)."""
+        grid = self.tables.get(code)
+        if grid is None:
+            return None
+        out = {}
+        for f, name in enumerate(FIELDS):
+            g = grid[f]
+            out[name] = g[h_hi + 1][a_hi + 1] - g[h_lo][a_hi + 1] - g[h_hi + 1][a_lo] + g[h_lo][a_lo]
+        return out
+
+    def query(self, code, odd_h, odd_a, prob_range=0.05):
+        """Outcome frequencies of the league's matches priced within ±prob_range."""
+        if not odd_h or not odd_a:
+            return None
+        prob_h, prob_a = 1 / odd_h, 1 / odd_a
+        stats = self.window(code,
+                            *edges(max(0.01, prob_h - prob_range), min(0.99, prob_h + prob_range)),
+                            *edges(max(0.01, prob_a - prob_range), min(0.99, prob_a + prob_range)))
+        if not stats or not stats['matches']:
+            return None
+        n = stats['matches']
+        home_mean, away_mean = stats['homeGoals'] / n, stats['awayGoals'] / n
+        return {
+            'sampleSize': n,
+            'homeProb': stats['home'] / n,
+            'drawProb': stats['draw'] / n,
+            'awayProb': stats['away'] / n,
+            'homeGoalsMean': home_mean,
+            'awayGoalsMean': away_mean,
+            'homeGoalsStdDev': math.sqrt(max(0.0, stats['homeGoals2'] / n - home_mean ** 2)),
+            'awayGoalsStdDev': math.sqrt(max(0.0, stats['awayGoals2'] / n - away_mean ** 2)),
+            'probRange': prob_range,
+        }
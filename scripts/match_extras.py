@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Per-match fields kept out of matches_full.json.
+
+The pages download matches_full.json whole and never read the B365 odds or
+the overall rating after each match (rating_history.py does), so the
+generator writes them to a compact side file instead, one row per match
+that has any of them, keyed by match id:
+
+    data/match_extras.json   {fields: ['id', 'oddH', 'oddD', 'oddA', 'homeOverallPost', 'awayOverallPost'],
+                              rows: [[1, 1.85, 3.9, 3.8, 1812.25, 1787.75], ...]}
+
+Python readers that need the fields put them back after loading
+matches_full.json:
+
+    matches = json.load(f)
+    match_extras.attach(matches)
+"""
+import json
+import os
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+EXTRAS_FILE = os.path.join(DATA_DIR, 'match_extras.json')
+
+FIELDS = ('oddH', 'oddD', 'oddA', 'homeOverallPost', 'awayOverallPost')
+
+
+def split(m):
+    """(match without the extra fields, row for the side file or None if it has none of them)."""
+    base = {k: v for k, v in m.items() if k not in FIELDS}
+    values = [m.get(k) for k in FIELDS]
+    return base, ([m.get('id')] + values if any(v is not None for v in values) else None)
+
+
+class Writer:
+    """Writes the side file one row at a time (used by the streaming generator)."""
+
+    def __init__(self, path=EXTRAS_FILE):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.f.write(json.dumps({'fields': ['id', *FIELDS]})[:-1] + ',"rows":[')
+        self.count = 0
+
+    def write(self, row):
+        if row is not None:
+            self.f.write((',' if self.count else '') + json.dumps(row, separators=(',', ':')))
+            self.count += 1
+
+    def close(self):
+        self.f.write(']}')
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write(matches, matches_path, path=EXTRAS_FILE):
+    """Write matches_full.json without the extra fields and the side file; returns the base matches."""
+    base = []
+    with Writer(path) as extras:
+        for m in matches:
+            b, row = split(m)
+            base.append(b)
+            extras.write(row)
+    with open(matches_path, 'w', encoding='utf-8') as f:
+        json.dump(base, f, ensure_ascii=False, indent=2)
+    return base
+
+
+def load(path=EXTRAS_FILE):
+    """{match id: {field: value}} from the side file ({} if there is none)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    fields = data['fields'][1:]
+    return {row[0]: dict(zip(fields, row[1:])) for row in data['rows']}
+
+
+def attach(matches, path=EXTRAS_FILE):
+    """Put the side-file fields back on matches loaded from matches_full.json, in place."""
+    extras = load(path)
+    missing = dict.fromkeys(FIELDS)
+    for m in matches:
+        m.update(extras.get(m.get('id'), missing))
+    return matches
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Point-in-time rating queries over matches_full.json.
+
+Loads the rating history once into per-club, date-sorted arrays (one per
+flavour) and answers "what was club X's rating on date D?" by binary search,
+without replaying the match stream:
+
+  - home:    home Elo (homeEloPost of the club's home matches)
+  - away:    away Elo (awayEloPost of the club's away matches)
+  - overall: overall Elo (home/awayOverallPost of every match, kept in the
+             match_extras.json side file)
+
+A rating "on" a date is the value the club carried into that day, i.e.
+after its last match strictly before the date, which is what a prediction
+as of kickoff needs. Pass inclusive=True to include matches on the date.
+Clubs without a match before the date are at BASE_ELO.
+
+    history = RatingHistory.load()
+    history.rating_at(511, '2024-01-01', 'home')
+    history.ratings_at([(511, '2024-01-01'), (510, '2024-01-01')], 'overall')
+    history.snapshot('2024-01-01', 'away')          # {clubId: rating}
+
+CLI:
+    python scripts/rating_history.py 511 2024-01-01 --flavour home
+    python scripts/rating_history.py --snapshot 2024-01-01 --flavour overall
+"""
+import argparse
+import bisect
+import json
+import os
+import sys
+from collections import defaultdict
+
+import match_extras
+from elo import BASE_ELO
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+MATCHES_FILE = os.path.join(DATA_DIR, 'matches_full.json')
+
+FLAVOURS = ('home', 'away', 'overall')
+
+
+def day(d):
+    # ISO dates compare correctly as strings; drop the time part
+    return str(d)[:10]
+
+
+class RatingHistory:
+    """Per-club sorted (date, rating) arrays for each flavour."""
+
+    def __init__(self, matches):
+        series = {f: defaultdict(lambda: ([], [])) for f in FLAVOURS}
+        for m in matches:
+            if not m.get('date'):
+                continue
+            d = day(m['date'])
+            entries = [('home', m['home'], m.get('homeEloPost')),
+                       ('away', m['away'], m.get('awayEloPost')),
+                       ('overall', m['home'], m.get('homeOverallPost')),
+                       ('overall', m['away'], m.get('awayOverallPost'))]
+            for flavour, cid, value in entries:
+                if value is not None:
+                    dates, values = series[flavour][cid]
+                    dates.append(d)
+                    values.append(value)
+        # matches_full.json is sorted by date already; sort defensively per club
+        self.series = {}
+        for flavour, clubs in series.items():
+            self.series[flavour] = {}
+            for cid, (dates, values) in clubs.items():
+                if any(dates[i] > dates[i + 1] for i in range(len(dates) - 1)):
+                    order = sorted(range(len(dates)), key=dates.__getitem__)
+                    dates = [dates[i] for i in order]
+                    values = [values[i] for i in order]
+                self.series[flavour][cid] = (dates, values)
+
+    @classmethod
+    def load(cls, path=MATCHES_FILE, extras_path=match_extras.EXTRAS_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(match_extras.attach(json.load(f), extras_path))
+
+    def clubs(self, flavour='overall'):
+        return list(self.series[flavour])
+
+    def rating_at(self, club_id, date, flavour='overall', inclusive=False):
+        dates, values = self.series[flavour].get(club_id, ((), ()))
+        search = bisect.bisect_right if inclusive else bisect.bisect_left
+        pos = search(dates, day(date))
+        return values[pos - 1] if pos else BASE_ELO
+
+    def ratings_at(self, queries, flavour='overall', inclusive=False):
+        """Batched lookups: `queries` is an iterable of (club_id, date)."""
+        return [self.rating_at(cid, d, flavour, inclusive) for cid, d in queries]
+
+    def snapshot(self, date, flavour='overall', inclusive=False):
+        """Ratings of every club seen in the history, as of `date`."""
+        return {cid: self.rating_at(cid, date, flavour, inclusive) for cid in self.series[flavour]}
+
+    def last_match_date(self, club_id, flavour='overall'):
+        dates, _ = self.series[flavour].get(club_id, ((), ()))
+        return dates[-1] if dates else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Club ratings at a point in time')
+    parser.add_argument('club', nargs='?', type=int, help='club id')
+    parser.add_argument('date', nargs='?', help='YYYY-MM-DD')
+    parser.add_argument('--snapshot', metavar='DATE', help='ratings of all clubs on DATE')
+    parser.add_argument('--flavour', choices=FLAVOURS, default='overall')
+    parser.add_argument('--inclusive', action='store_true', help='include matches played on the date')
+    parser.add_argument('--matches', default=MATCHES_FILE, help='matches file (default: data/matches_full.json)')
+    parser.add_argument('--extras', default=match_extras.EXTRAS_FILE,
+                        help='side file with the overall ratings (default: data/match_extras.json)')
+    args = parser.parse_args(argv)
+
+    if not args.snapshot and (args.club is None or not args.date):
+        parser.error('give CLUB DATE or --snapshot DATE')
+
+    history = RatingHistory.load(args.matches, args.extras)
+    if args.snapshot:
+        result = history.snapshot(args.snapshot, args.flavour, args.inclusive)
+        json.dump({str(k): round(v, 2) for k, v in sorted(result.items())}, sys.stdout, indent=2)
+        print()
+    else:
+        print(round(history.rating_at(args.club, args.date, args.flavour, args.inclusive), 2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo projection of the current season of every league in data/.
+
+For each league code (E0, D1, ...) the current season is its latest CSV.
+The remaining fixtures are the meetings of the regular season (a double
+round robin, or MEETINGS rounds) that have not been played yet. A fixture of
+data/fixtures.json takes the place of its scheduled meeting (fixing the
+host); it is added on top of the schedule only when it is not in the CSV yet
+and the league plays on after the regular season (LEAGUE_FORMATS, e.g. the
+post-split rounds of SC0). Every remaining match is
+sampled from the league's goal model (goal_model.py, Dixon-Coles score
+grid) or, for leagues without one, from the Elo 1X2 probabilities of
+ratings_home_away.json (a win then counts as a one-goal margin).
+
+Simulations are vectorized with NumPy, one array row per simulated season,
+and split in chunks across a process pool with independent SeedSequence
+streams. The result is written to data/season_simulation.json:
+per club, the distribution of final positions, expected points and the
+title, promotion and relegation probabilities (direct spots only,
+play-offs are not modelled; see LEAGUE_ZONES). For the leagues of
+LEAGUE_FORMATS the title odds are those of one final table as well; their
+`format` field in the output says what is left out.
+
+    python scripts/simulate_season.py                     # all leagues, 100k seasons each
+    python scripts/simulate_season.py --leagues E0 E1 --sims 200000 --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+
+from generate_fixtures import elo_outcome_probs
+from generate_matches_and_ratings import BASE_ELO, parse_date
+from goal_model import GoalModel
+from leaderboards import current_seasons
+from leagues import source_parts
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CLUBS_FILE = os.path.join(DATA_DIR, 'clubs.json')
+MATCHES_FILE = os.path.join(DATA_DIR, 'matches_full.json')
+RATINGS_HA_FILE = os.path.join(DATA_DIR, 'ratings_home_away.json')
+GOAL_MODEL_FILE = os.path.join(DATA_DIR, 'goal_model.json')
+FIXTURES_FILE = os.path.join(DATA_DIR, 'fixtures.json')
+OUT_FILE = os.path.join(DATA_DIR, 'season_simulation.json')
+
+SIMULATIONS = 100000
+CHUNK = 25000
+MAX_GOALS = 8
+
+# meetings of every pair before any split (default: double round robin)
+MEETINGS = {'SC0': 3}
+
+# direct promotion / relegation places per league
+LEAGUE_ZONES = {
+    'E0': {'relegation': 3},
+    'E1': {'promotion': 2, 'relegation': 3},
+    'D1': {'relegation': 2},
+    'D2': {'promotion': 2, 'relegation': 2},
+    'SP1': {'relegation': 3},
+    'SP2': {'promotion': 2, 'relegation': 4},
+    'I1': {'relegation': 3},
+    'I2': {'promotion': 2, 'relegation': 3},
+    'F1': {'relegation': 2},
+    'F2': {'promotion': 2, 'relegation': 2},
+    'N1': {'relegation': 2},
+    'B1': {'relegation': 2},
+    'P1': {'relegation': 2},
+    'SC0': {'relegation': 1},
+    'G1': {'relegation': 2},
+    'T1': {'relegation': 3},
+}
+
+# leagues that play on after the regular season; the simulation ranks one table
+# over every remaining fixture, so these post-season formats are not modelled
+LEAGUE_FORMATS = {
+    'B1': 'regular season only: the championship play-offs (points halved) decide the title and are not modelled',
+    'G1': 'regular season only: the play-off groups decide the title and are not modelled',
+    'SC0': 'the split is not modelled: post-split fixtures in fixtures.json are simulated, '
+           'but clubs are not held to their half of the table',
+}
+
+
+def league_state(matches, code, season, feed):
+    """Clubs, current table and remaining fixtures (as club index pairs) of one league."""
+    played = [m for m in matches if source_parts(m.get('source')) == (code, season)]
+    ids = sorted({m['home'] for m in played} | {m['away'] for m in played})
+    index = {cid: i for i, cid in enumerate(ids)}
+    n = len(ids)
+    points = np.zeros(n, np.int64)
+    gf = np.zeros(n, np.int64)
+    ga = np.zeros(n, np.int64)
+    games = np.zeros(n, np.int64)
+    hosted = defaultdict(int)  # (home, away) -> meetings played so far
+    for m in played:
+        h, a = index[m['home']], index[m['away']]
+        hg, ag = m['homeGoals'], m['awayGoals']
+        gf[h] += hg
+        ga[h] += ag
+        gf[a] += ag
+        ga[a] += hg
+        games[h] += 1
+        games[a] += 1
+        points[h] += 3 if hg > ag else 1 if hg == ag else 0
+        points[a] += 3 if ag > hg else 1 if hg == ag else 0
+        hosted[(h, a)] += 1
+
+    # missing meetings of the regular season; each goes to the club that hosted
+    # the pairing fewer times, then to the club with fewer home games
+    meetings = MEETINGS.get(code, 2)
+    home_games = np.bincount([index[m['home']] for m in played], minlength=n)
+    remaining = []
+    for i in range(n):
+        for j in range(i + 1, n):
+            for _ in range(meetings - hosted[(i, j)] - hosted[(j, i)]):
+                h, a = (i, j) if (hosted[(i, j)], home_games[i]) <= (hosted[(j, i)], home_games[j]) else (j, i)
+                hosted[(h, a)] += 1
+                home_games[h] += 1
+                remaining.append((h, a))
+    # feed fixtures: skip those already in the CSV, let the rest take the place of
+    # their scheduled meeting, and add one beyond the schedule only after a split
+    played_keys = {(m['home'], m['away'], (m.get('date') or '')[:10]) for m in played}
+    missing = Counter(remaining)
+    for hid, aid, date in feed.get(code, ()):
+        if (hid, aid, date) in played_keys:
+            continue
+        pair = (index.get(hid), index.get(aid))
+        if None in pair:
+            continue
+        if missing[pair]:
+            missing[pair] -= 1
+        elif missing[pair[::-1]]:
+            # the schedule guessed the other host
+            missing[pair[::-1]] -= 1
+            remaining[remaining.index(pair[::-1])] = pair
+        elif code in LEAGUE_FORMATS:
+            remaining.append(pair)
+    return ids, points, gf - ga, gf, games, np.array(remaining, np.int64).reshape(-1, 2)
+
+
+def alias_tables(probs):
+    """Walker/Vose alias tables, one row per fixture, for O(1) sampling of its outcome."""
+    n_fix, k = probs.shape
+    scaled = probs / probs.sum(axis=1, keepdims=True) * k
+    accept = np.ones((n_fix, k))
+    alias = np.tile(np.arange(k), (n_fix, 1))
+    for f in range(n_fix):
+        p = scaled[f].copy()
+        small = [i for i in range(k) if p[i] < 1]
+        large = [i for i in range(k) if p[i] >= 1]
+        while small and large:
+            s_, l_ = small.pop(), large.pop()
+            accept[f, s_] = p[s_]
+            alias[f, s_] = l_
+            p[l_] -= 1 - p[s_]
+            (small if p[l_] < 1 else large).append(l_)
+    return accept, alias
+
+
+def outcome_tables(code, ids, fixtures, model, ratings):
+    """Per fixture: alias tables over its outcomes and the (home, away) goals of each outcome."""
+    if not len(fixtures):
+        # season over: nothing to sample
+        return np.ones((0, 1)), np.zeros((0, 1), np.int64), np.zeros(1, np.int64), np.zeros(1, np.int64), 'final'
+    if model is not None and code in model.leagues:
+        grids = model.score_matrix(code, [ids[h] for h, _ in fixtures], [ids[a] for _, a in fixtures], MAX_GOALS)
+        goals = np.arange(MAX_GOALS + 1)
+        home_goals = np.repeat(goals, MAX_GOALS + 1)
+        away_goals = np.tile(goals, MAX_GOALS + 1)
+        accept, alias = alias_tables(grids.reshape(len(fixtures), -1))
+        return accept, alias, home_goals, away_goals, 'goal_model'
+
+    probs = []
+    for h, a in fixtures:
+        home_elo = ratings.get(ids[h], {}).get('homeElo', BASE_ELO)
+        away_elo = ratings.get(ids[a], {}).get('awayElo', BASE_ELO)
+        probs.append(elo_outcome_probs(home_elo, away_elo))
+    accept, alias = alias_tables(np.array(probs, np.float64).reshape(-1, 3))
+    return accept, alias, np.array([1, 0, 0]), np.array([0, 0, 1]), 'elo'
+
+
+def simulate_chunk(task):
+    """Simulate `sims` seasons of one league; returns position counts and summed points."""
+    points, gd, gf, fixtures, accept, alias, home_goals, away_goals, sims, seed = task
+    rng = np.random.default_rng(seed)
+    n, n_fix = len(points), len(fixtures)
+    k = accept.shape[1]
+
+    # one outcome per (season, fixture): a uniform picks a cell, its fraction accepts it or its alias
+    u = rng.random((sims, n_fix)) * k
+    cell = np.minimum(u.astype(np.int64), k - 1)
+    rows = np.arange(n_fix)[None, :]
+    outcome = np.where(u - cell < accept[rows, cell], cell, alias[rows, cell])
+
+    # The table order (points, goal difference, goals scored) is one linear key,
+    # points * 1e7 + goal difference * 1e3 + goals, as long as |goal difference| < 5000
+    # and goals < 1000; so every outcome adds a fixed amount to each side's key.
+    hg, ag = home_goals.astype(np.float64), away_goals.astype(np.float64)
+    home_val = np.where(hg > ag, 3, np.where(hg == ag, 1, 0)) * 1e7 + (hg - ag) * 1e3 + hg
+    away_val = np.where(ag > hg, 3, np.where(hg == ag, 1, 0)) * 1e7 + (ag - hg) * 1e3 + ag
+
+    # fixture -> club incidence matrices turn the per-club sums into matrix products
+    home_of = np.zeros((n_fix, n))
+    away_of = np.zeros((n_fix, n))
+    home_of[np.arange(n_fix), fixtures[:, 0]] = 1
+    away_of[np.arange(n_fix), fixtures[:, 1]] = 1
+    key = points * 1e7 + gd * 1e3 + gf + home_val[outcome] @ home_of + away_val[outcome] @ away_of
+    pts = np.rint(key / 1e7)
+
+    # a random draw below one goal breaks the remaining ties
+    order = np.argsort(-(key + rng.random((sims, n))), axis=1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n)[None, :], axis=1)
+    counts = np.bincount((np.arange(n)[None, :] * n + positions).ravel(), minlength=n * n).reshape(n, n)
+    return counts, pts.sum(axis=0)
+
+
+def summarize(code, season, ids, points, games, fixtures, counts, points_sum, sims, source, clubs_by_id):
+    zones = LEAGUE_ZONES.get(code, {})
+    n = len(ids)
+    probs = counts / sims
+    promo, releg = zones.get('promotion', 0), zones.get('relegation', 0)
+    rows = []
+    for i, cid in enumerate(ids):
+        rows.append({
+            'clubId': cid,
+            'name': clubs_by_id.get(cid, {}).get('name', str(cid)),
+            'points': int(points[i]),
+            'played': int(games[i]),
+            'expectedPoints': round(float(points_sum[i] / sims), 2),
+            'expectedPosition': round(float((probs[i] * np.arange(1, n + 1)).sum()), 2),
+            'title': round(float(probs[i, 0]), 5),
+            'promotion': round(float(probs[i, :promo].sum()), 5) if promo else None,
+            'relegation': round(float(probs[i, n - releg:].sum()), 5) if releg else None,
+            'positions': [round(float(p), 5) for p in probs[i]],
+        })
+    rows.sort(key=lambda r: (r['expectedPosition'], r['name']))
+    return {'season': season, 'model': source, 'played': int(games.sum() // 2),
+            'remaining': len(fixtures), 'zones': zones, 'format': LEAGUE_FORMATS.get(code),
+            'clubs': rows}
+
+
+def load_feed(path):
+    """Upcoming fixtures of the fixtures pipeline, as {code: [(homeId, awayId, 'YYYY-MM-DD')]}."""
+    feed = defaultdict(list)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for fx in json.load(f).get('fixtures', []):
+                if fx.get('div') and fx.get('homeId') is not None and fx.get('awayId') is not None:
+                    date = parse_date(fx.get('date'))
+                    feed[fx['div']].append((fx['homeId'], fx['awayId'], date.strftime('%Y-%m-%d') if date else ''))
+    return feed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Monte Carlo projection of the current seasons')
+    parser.add_argument('--leagues', nargs='*', help='league codes (default: every league in data/)')
+    parser.add_argument('--sims', type=int, default=SIMULATIONS, help=f'seasons per league (default: {SIMULATIONS})')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=None, help='seed for reproducible runs')
+    parser.add_argument('--out', default=OUT_FILE, help='output file (default: data/season_simulation.json)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with open(CLUBS_FILE, 'r', encoding='utf-8') as f:
+        clubs_by_id = {c['id']: c for c in json.load(f)}
+    with open(MATCHES_FILE, 'r', encoding='utf-8') as f:
+        matches = json.load(f)
+    with open(RATINGS_HA_FILE, 'r', encoding='utf-8') as f:
+        ratings = {r['clubId']: r for r in json.load(f)}
+    model = GoalModel.load(GOAL_MODEL_FILE) if os.path.exists(GOAL_MODEL_FILE) else None
+    feed = load_feed(FIXTURES_FILE)
+    latest, _ = current_seasons(matches)
+    codes = [c.upper() for c in args.leagues] if args.leagues else sorted(latest)
+
+    seed_seq = np.random.SeedSequence(args.seed)
+    leagues, tasks = {}, []
+    for code in codes:
+        if code not in latest:
+            print(f'No matches for league {code}, skipped')
+            continue
+        ids, points, gd, gf, games, fixtures = league_state(matches, code, latest[code], feed)
+        accept, alias, home_goals, away_goals, source = outcome_tables(code, ids, fixtures, model, ratings)
+        leagues[code] = (ids, points, games, fixtures, source)
+        chunks = [min(CHUNK, args.sims - i) for i in range(0, args.sims, CHUNK)]
+        for sims, seed in zip(chunks, seed_seq.spawn(len(chunks))):
+            tasks.append((code, (points, gd, gf, fixtures, accept, alias, home_goals, away_goals, sims, seed)))
+
+    with Pool(args.workers) as pool:
+        results = pool.map(simulate_chunk, [t for _, t in tasks])
+
+    totals = {}
+    for (code, _), (counts, points_sum) in zip(tasks, results):
+        if code in totals:
+            totals[code][0] += counts
+            totals[code][1] += points_sum
+        else:
+            totals[code] = [counts, points_sum]
+
+    out = {
+        'updated': datetime.utcnow().replace(microsecond=0).isoformat() + 'Z',
+        'simulations': args.sims,
+        'leagues': {},
+    }
+    for code, (ids, points, games, fixtures, source) in leagues.items():
+        counts, points_sum = totals[code]
+        out['leagues'][code] = summarize(code, latest[code], ids, points, games, fixtures,
+                                         counts, points_sum, args.sims, source, clubs_by_id)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(out, f, ensure_ascii=False, separators=(',', ':'))
+
+    elapsed = time.perf_counter() - start
+    print(f'Simulated {args.sims} seasons of {len(leagues)} leagues in {elapsed:.1f}s -> {args.out}')
+    for code, lg in out['leagues'].items():
+        top = lg['clubs'][0]
+        print(f"  {code} {lg['season']}: {lg['remaining']} fixtures left, "
+              f"favourite {top['name']} ({top['title']:.1%} title, {lg['model']})")
+        if lg['format']:
+            print(f"    {lg['format']}")
+
+
+if __name__ == '__main__':
+    main()
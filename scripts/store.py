@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Optional SQLite store for clubs, aliases, matches and rating snapshots.
+
+The generator maintains it with upserts when run with --sqlite, and then
+exports the usual JSON files (matches_full.json, match_extras.json,
+ratings.json, ratings_home_away.json, unmapped_names.json) from it.
+fixture_proxy.py and ad-hoc tools query it directly instead of parsing the
+JSON files:
+
+    python scripts/store.py sql "SELECT * FROM matches WHERE home = 511 ORDER BY date DESC LIMIT 5"
+    python scripts/store.py export            # rewrite the JSON files from the database
+
+Matches are keyed by (source, date, home, away); rows that disappear from
+the CSVs are deleted at the end of each upsert. Rating snapshots are kept per
+club and rating date, so every generator run adds one dated snapshot; clubs
+removed from clubs.json are dropped with their aliases and snapshots. Rating
+and odds columns have no declared type, so SQLite keeps ints and floats as
+written and the exported JSON files match the ones the generator writes.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+
+from club_matcher import normalize
+from leagues import league_code
+import match_extras
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+DB_FILE = os.path.join(DATA_DIR, 'elo.sqlite')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clubs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    league TEXT,
+    continent TEXT
+);
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT PRIMARY KEY,          -- normalized name
+    club_id INTEGER NOT NULL REFERENCES clubs(id)
+);
+CREATE TABLE IF NOT EXISTS matches (
+    id INTEGER NOT NULL,             -- position in matches_full.json
+    source TEXT NOT NULL,
+    league TEXT NOT NULL,
+    date TEXT NOT NULL,              -- ISO datetime, '' when unparseable
+    date_raw TEXT,
+    home INTEGER NOT NULL,
+    away INTEGER NOT NULL,
+    home_goals INTEGER NOT NULL,
+    away_goals INTEGER NOT NULL,
+    odd_h, odd_d, odd_a,             -- untyped: values keep their int/float type
+    home_elo_pre, away_elo_pre,
+    home_elo_post, away_elo_post,
+    home_delta, away_delta,
+    home_overall_post, away_overall_post,
+    run INTEGER NOT NULL,
+    UNIQUE (source, date, home, away)
+);
+CREATE INDEX IF NOT EXISTS matches_league_date ON matches (league, date);
+CREATE INDEX IF NOT EXISTS matches_home_date ON matches (home, date);
+CREATE INDEX IF NOT EXISTS matches_away_date ON matches (away, date);
+CREATE INDEX IF NOT EXISTS matches_elo ON matches (home_elo_pre, away_elo_pre);
+CREATE TABLE IF NOT EXISTS rating_snapshots (
+    club_id INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    elo,                             -- untyped, as in matches
+    home_elo,
+    away_elo,
+    overall_elo,
+    home_games INTEGER,
+    away_games INTEGER,
+    glicko_rating,
+    glicko_rd,
+    glicko_volatility,
+    PRIMARY KEY (club_id, date)
+);
+CREATE TABLE IF NOT EXISTS unmapped_names (
+    name TEXT PRIMARY KEY,
+    suggestions TEXT NOT NULL        -- JSON list of normalized club names
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# matches_full.json key -> column, in the order the generator writes them
+MATCH_COLUMNS = [
+    ('date_raw', 'date_raw'),
+    ('date', 'date'),
+    ('home', 'home'),
+    ('away', 'away'),
+    ('homeGoals', 'home_goals'),
+    ('awayGoals', 'away_goals'),
+    ('oddH', 'odd_h'),
+    ('oddD', 'odd_d'),
+    ('oddA', 'odd_a'),
+    ('source', 'source'),
+    ('homeEloPre', 'home_elo_pre'),
+    ('awayEloPre', 'away_elo_pre'),
+    ('homeEloPost', 'home_elo_post'),
+    ('awayEloPost', 'away_elo_post'),
+    ('homeDelta', 'home_delta'),
+    ('awayDelta', 'away_delta'),
+    ('homeOverallPost', 'home_overall_post'),
+    ('awayOverallPost', 'away_overall_post'),
+    ('id', 'id'),
+]
+
+
+def connect(path=DB_FILE, readonly=False):
+    if readonly:
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    else:
+        conn = sqlite3.connect(path)
+        conn.executescript(SCHEMA)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def upsert_clubs(conn, clubs):
+    with conn:
+        conn.executemany(
+            'INSERT INTO clubs (id, name, league, continent) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET name = excluded.name, league = excluded.league, '
+            'continent = excluded.continent',
+            [(c['id'], c['name'], c.get('league'), c.get('continent')) for c in clubs if c.get('id') is not None])
+        rows = []
+        for c in clubs:
+            for label in [c.get('name')] + list(c.get('aliases') or []):
+                if label and c.get('id') is not None:
+                    rows.append((normalize(label), c['id']))
+        conn.execute('DELETE FROM aliases')
+        conn.executemany('INSERT INTO aliases (alias, club_id) VALUES (?, ?) '
+                         'ON CONFLICT(alias) DO UPDATE SET club_id = excluded.club_id', rows)
+        # clubs gone from clubs.json take their rating snapshots with them
+        ids = [c['id'] for c in clubs if c.get('id') is not None]
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS current_clubs (id INTEGER PRIMARY KEY)')
+        conn.execute('DELETE FROM current_clubs')
+        conn.executemany('INSERT OR IGNORE INTO current_clubs (id) VALUES (?)', [(i,) for i in ids])
+        conn.execute('DELETE FROM rating_snapshots WHERE club_id NOT IN (SELECT id FROM current_clubs)')
+        conn.execute('DELETE FROM clubs WHERE id NOT IN (SELECT id FROM current_clubs)')
+
+
+def upsert_matches(conn, matches):
+    """Insert or update every match and drop rows the CSVs no longer have."""
+    cols = [col for _, col in MATCH_COLUMNS] + ['league', 'run']
+    keys = ('source', 'date', 'home', 'away')
+    updates = ', '.join(f'{c} = excluded.{c}' for c in cols if c not in keys)
+    sql = (f'INSERT INTO matches ({", ".join(cols)}) VALUES ({", ".join("?" * len(cols))}) '
+           f'ON CONFLICT(source, date, home, away) DO UPDATE SET {updates}')
+    with conn:
+        run = conn.execute("SELECT COALESCE(MAX(run), 0) + 1 FROM matches").fetchone()[0]
+        rows = []
+        for m in matches:
+            values = [m.get(key) for key, _ in MATCH_COLUMNS]
+            values[1] = values[1] or ''
+            rows.append(values + [league_code(m.get('source')), run])
+        conn.executemany(sql, rows)
+        conn.execute('DELETE FROM matches WHERE run != ?', (run,))
+
+
+def upsert_snapshots(conn, ratings_ha, overall_elos, date):
+    day = (date or '')[:10]
+    rows = []
+    for r in ratings_ha:
+        cid = r['clubId']
+        rows.append((cid, day, overall_elos.get(cid), r['homeElo'], r['awayElo'], r['overallElo'],
+                     r['homeGames'], r['awayGames'],
+                     r.get('glickoRating'), r.get('glickoRd'), r.get('glickoVolatility')))
+    with conn:
+        conn.executemany(
+            'INSERT OR REPLACE INTO rating_snapshots (club_id, date, elo, home_elo, away_elo, overall_elo, '
+            'home_games, away_games, glicko_rating, glicko_rd, glicko_volatility) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rating_date', ?)", (date,))
+
+
+def replace_unmapped(conn, suggestions):
+    with conn:
+        conn.execute('DELETE FROM unmapped_names')
+        conn.executemany('INSERT INTO unmapped_names (name, suggestions) VALUES (?, ?)',
+                         [(k, json.dumps(v, ensure_ascii=False)) for k, v in suggestions.items()])
+
+
+def export_matches(conn, path, extras_path=match_extras.EXTRAS_FILE):
+    matches = []
+    cur = conn.execute(f'SELECT {", ".join(col for _, col in MATCH_COLUMNS)} FROM matches ORDER BY id')
+    for row in cur:
+        m = {key: row[col] for key, col in MATCH_COLUMNS}
+        m['date'] = m['date'] or None
+        matches.append(m)
+    match_extras.write(matches, path, extras_path)
+    return len(matches)
+
+
+def latest_snapshots(conn):
+    return conn.execute(
+        'SELECT s.* FROM rating_snapshots s '
+        'JOIN (SELECT club_id, MAX(date) AS date FROM rating_snapshots GROUP BY club_id) last '
+        'USING (club_id, date) ORDER BY s.club_id').fetchall()
+
+
+def export_ratings(conn, ratings_path, ratings_ha_path):
+    rating_date = conn.execute("SELECT value FROM meta WHERE key = 'rating_date'").fetchone()
+    rating_date = rating_date[0] if rating_date else None
+    ratings, ratings_ha = [], []
+    for s in latest_snapshots(conn):
+        ratings.append({'clubId': s['club_id'], 'date': rating_date or s['date'], 'elo': round(s['elo'], 2)})
+        r = {'clubId': s['club_id'], 'homeElo': s['home_elo'], 'awayElo': s['away_elo'],
+             'overallElo': s['overall_elo'], 'homeGames': s['home_games'], 'awayGames': s['away_games']}
+        if s['glicko_rating'] is not None:
+            r.update(glickoRating=s['glicko_rating'], glickoRd=s['glicko_rd'],
+                     glickoVolatility=s['glicko_volatility'])
+        ratings_ha.append(r)
+    with open(ratings_ha_path, 'w', encoding='utf-8') as f:
+        json.dump(ratings_ha, f, ensure_ascii=False, indent=2)
+    with open(ratings_path, 'w', encoding='utf-8') as f:
+        json.dump(ratings, f, ensure_ascii=False, indent=2)
+
+
+def export_unmapped(conn, path):
+    out = {row['name']: json.loads(row['suggestions'])
+           for row in conn.execute('SELECT name, suggestions FROM unmapped_names ORDER BY name')}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(out, f, ensure_ascii=False, indent=2)
+
+
+def query(conn, sql, params=()):
+    return [dict(row) for row in conn.execute(sql, params)]
+
+
+def club_matches(conn, club_id=None, league=None, date_from=None, date_to=None, limit=100):
+    """Matches filtered by club, league and date range, newest first (uses the indexes)."""
+    where, params = [], []
+    if club_id is not None:
+        where.append('(home = ? OR away = ?)')
+        params += [club_id, club_id]
+    if league:
+        where.append('league = ?')
+        params.append(league.upper())
+    if date_from:
+        where.append('date >= ?')
+        params.append(date_from)
+    if date_to:
+        where.append('date <= ?')
+        params.append(date_to)
+    sql = 'SELECT * FROM matches'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY date DESC LIMIT ?'
+    params.append(limit)
+    return query(conn, sql, params)
+
+
+def main(argv=None):
+    import generate_matches_and_ratings as gen
+
+    parser = argparse.ArgumentParser(description='Query or export the SQLite store')
+    parser.add_argument('--db', default=DB_FILE, help='database file (default: data/elo.sqlite)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sql_cmd = sub.add_parser('sql', help='run a read-only SQL query and print JSON rows')
+    sql_cmd.add_argument('statement')
+    sub.add_parser('export', help='rewrite the JSON files from the database')
+    args = parser.parse_args(argv)
+
+    if args.command == 'sql':
+        conn = connect(args.db, readonly=True)
+        json.dump(query(conn, args.statement), sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        conn = connect(args.db)
+        n = export_matches(conn, gen.OUT_MATCHES, gen.OUT_MATCH_EXTRAS)
+        export_ratings(conn, gen.OUT_RATINGS, gen.OUT_RATINGS_HA)
+        export_unmapped(conn, gen.OUT_UNMAPPED)
+        print(f'Exported {n} matches and the rating files from {args.db}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory helpers for generate_matches_and_ratings.py --stream.
+
+external_sort() sorts an iterable that may not fit in memory: items are
+collected into runs of at most max_rows, each run is sorted and pickled to a
+temporary file, and the runs are merged lazily with heapq.merge. The sort is
+stable, so the result is identical to sorted(items, key=key).
+
+JsonArrayWriter writes a JSON array one item at a time, byte-for-byte as
+json.dump(items, f, ensure_ascii=False, indent=2) would; NdjsonWriter writes
+one compact JSON object per line.
+"""
+import heapq
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+
+def _write_run(rows, key, tmp_dir, n):
+    rows.sort(key=key)
+    path = os.path.join(tmp_dir, f'run_{n:05d}.pickle')
+    with open(path, 'wb') as f:
+        for row in rows:
+            pickle.dump(row, f, pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def _read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def external_sort(items, key, max_rows=100000, tmp_dir=None):
+    """Yield `items` sorted by `key`, holding at most max_rows items per run in memory."""
+    work_dir = tempfile.mkdtemp(prefix='elo_sort_', dir=tmp_dir)
+    try:
+        runs, rows = [], []
+        for item in items:
+            rows.append(item)
+            if len(rows) >= max_rows:
+                runs.append(_write_run(rows, key, work_dir, len(runs)))
+                rows = []
+        if not runs:
+            # everything fitted in one run: no need to touch the disk
+            rows.sort(key=key)
+            yield from rows
+            return
+        if rows:
+            runs.append(_write_run(rows, key, work_dir, len(runs)))
+        del rows
+        yield from heapq.merge(*(_read_run(p) for p in runs), key=key)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class JsonArrayWriter:
+    """Incremental writer for a pretty-printed JSON array."""
+
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, item):
+        text = json.dumps(item, ensure_ascii=False, indent=2)
+        self.f.write(('[\n  ' if self.count == 0 else ',\n  ') + text.replace('\n', '\n  '))
+        self.count += 1
+
+    def close(self):
+        self.f.write('\n]' if self.count else '[]')
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NdjsonWriter:
+    """One JSON object per line."""
+
+    def __init__(self, path):
+        self.f = open(path, 'w', encoding='utf-8')
+        self.count = 0
+
+    def write(self, item):
+        self.f.write(json.dumps(item, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.count += 1
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()